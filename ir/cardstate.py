@@ -0,0 +1,97 @@
+# Copyright 2017-2019 Joseph Lorimer <joseph@lorimer.me>
+#
+# Permission to use, copy, modify, and distribute this software for any purpose
+# with or without fee is hereby granted, provided that the above copyright
+# notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import os
+import sqlite3
+
+from aqt import mw
+
+DEFAULT_SCROLL = 0
+DEFAULT_ZOOM = 1
+
+
+def getCardStatePath():
+    return os.path.join(mw.pm.profileFolder(), "ir_cards.db")
+
+
+class CardState:
+    """Record each card's scroll position and zoom factor.
+
+    Only cards that differ from the defaults have a row, keyed by the
+    integer card ID.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """create table if not exists cards (
+                   id integer primary key,
+                   scroll integer not null default 0,
+                   zoom real not null default 1
+               )"""
+        )
+        self._db.commit()
+
+    def migrate(self, scroll, zoom):
+        """Import the scroll and zoom dicts formerly kept in the settings
+        files, which are keyed by card ID strings.
+
+        Cards that already have a row are left alone, so migrating again after
+        an interrupted cleanup never overwrites newer positions.
+        """
+        stored = {cid for (cid,) in self._db.execute("select id from cards")}
+        for cid, pos in scroll.items():
+            if int(cid) not in stored:
+                self._set(int(cid), "scroll", int(pos))
+        for cid, factor in zoom.items():
+            if int(cid) not in stored:
+                self._set(int(cid), "zoom", round(factor, 2))
+        self._db.commit()
+
+    def getScroll(self, cid):
+        return self._get(cid, "scroll", DEFAULT_SCROLL)
+
+    def getZoom(self, cid):
+        return self._get(cid, "zoom", DEFAULT_ZOOM)
+
+    def setScroll(self, cid, pos):
+        self._set(cid, "scroll", int(pos))
+        self._db.commit()
+
+    def setZoom(self, cid, factor):
+        self._set(cid, "zoom", round(factor, 2))
+        self._db.commit()
+
+    def prune(self, cids):
+        """Forget cards that are not among cids, i.e. have been deleted."""
+        stored = {cid for (cid,) in self._db.execute("select id from cards")}
+        self._db.executemany(
+            "delete from cards where id = ?", [(cid,) for cid in stored - set(cids)]
+        )
+        self._db.commit()
+
+    def _get(self, cid, column, default):
+        row = self._db.execute(
+            "select %s from cards where id = ?" % column, (cid,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def _set(self, cid, column, value):
+        self._db.execute("insert or ignore into cards (id) values (?)", (cid,))
+        self._db.execute("update cards set %s = ? where id = ?" % column, (value, cid))
+        self._db.execute(
+            "delete from cards where id = ? and scroll = ? and zoom = ?",
+            (cid, DEFAULT_SCROLL, DEFAULT_ZOOM),
+        )
@@ -0,0 +1,387 @@
+# Copyright 2017-2019 Joseph Lorimer <joseph@lorimer.me>
+#
+# Permission to use, copy, modify, and distribute this software for any purpose
+# with or without fee is hereby granted, provided that the above copyright
+# notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from random import uniform
+from threading import Lock
+from urllib.parse import urljoin
+from xml.etree.ElementTree import ParseError, iterparse
+
+from aqt import mw
+from PyQt5.QtCore import QTimer
+
+# downloaded links are forgotten once they are this old and have dropped out
+# of their feed
+FEED_LOG_RETENTION = 365 * 24 * 60 * 60
+
+POLL_INTERVAL = 3 * 60 * 60
+POLL_JITTER = 0.1
+MAX_BACKOFF = 2 * 24 * 60 * 60
+POLL_WORKERS = 2
+REFRESH_WORKERS = 8
+POLL_CHECK_INTERVAL = 5 * 60
+
+# root and entry elements of RSS 2.0, RSS 1.0 (RDF) and Atom documents
+FEED_ROOTS = {"rss", "RDF", "feed"}
+ENTRY_TAGS = {"item", "entry"}
+
+
+def getFeedLogPath():
+    return os.path.join(mw.pm.profileFolder(), "ir_feeds.db")
+
+
+def _splitTag(tag):
+    namespace, _, name = tag.rpartition("}")
+    return namespace, name
+
+
+def _entryLink(entry, namespace):
+    for child in entry:
+        if child.tag != namespace + "link":
+            continue
+        if "href" in child.attrib:
+            if child.get("rel", "alternate") == "alternate":
+                return child.get("href").strip()
+        elif child.text and child.text.strip():
+            return child.text.strip()
+
+    guid = entry.find(namespace + "guid")
+    if guid is not None and guid.text and guid.get("isPermaLink") != "false":
+        return guid.text.strip()
+
+    return None
+
+
+def parseEntries(data, baseUrl=""):
+    """Read the entry titles and links of a well-formed RSS or Atom feed.
+
+    Only the fields the importer uses are extracted, and none of the content
+    is sanitized, since articles are fetched and cleaned separately. Returns
+    None if the document is not a well-formed feed, in which case it should
+    be handed to feedparser instead.
+    """
+    entries = []
+
+    try:
+        events = iterparse(BytesIO(data), events=("start", "end"))
+        _, root = next(events)
+        if _splitTag(root.tag)[1] not in FEED_ROOTS:
+            return None
+
+        for event, elem in events:
+            namespace, name = _splitTag(elem.tag)
+            if event != "end" or name not in ENTRY_TAGS:
+                continue
+
+            if namespace:
+                namespace += "}"
+            link = _entryLink(elem, namespace)
+            if link:
+                title = elem.find(namespace + "title")
+                title = "".join(title.itertext()).strip() if title is not None else ""
+                link = urljoin(baseUrl, link)
+                entries.append({"link": link, "title": title or link})
+            elem.clear()
+    except (ParseError, StopIteration):
+        return None
+
+    return {"entries": entries, "bozo": 0}
+
+
+class FeedLog:
+    """Record which feed entries have been imported, and each feed's
+    ETag and Last-Modified values for conditional requests."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """create table if not exists feeds (
+                   url text primary key,
+                   etag text,
+                   modified text
+               );
+               create table if not exists entries (
+                   feed text not null,
+                   link text not null,
+                   downloaded integer not null,
+                   primary key (feed, link)
+               ) without rowid;
+               create table if not exists staged (
+                   feed text not null,
+                   link text not null,
+                   title text,
+                   unique (feed, link)
+               );"""
+        )
+        columns = [c[1] for c in self._db.execute("pragma table_info(feeds)")]
+        for column in ["subscribed", "nextPoll", "failures"]:
+            if column not in columns:
+                self._db.execute(
+                    "alter table feeds add column %s integer not null default 0"
+                    % column
+                )
+        self._db.commit()
+
+    def migrate(self, feedLog):
+        """Import the feedLog dict formerly kept in the settings file."""
+        now = int(time.time())
+        for url, log in feedLog.items():
+            self.update(url, log.get("etag"), log.get("modified"))
+            self.addEntries(url, log.get("downloaded", []), now)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def getValidators(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "select etag, modified from feeds where url = ?", (url,)
+            ).fetchone()
+        return row or (None, None)
+
+    def update(self, url, etag, modified):
+        with self._lock:
+            self._db.execute("insert or ignore into feeds (url) values (?)", (url,))
+            self._db.execute(
+                "update feeds set etag = ?, modified = ? where url = ?",
+                (etag, modified, url),
+            )
+            self._db.commit()
+
+    def subscribe(self, url):
+        """Poll a feed in the background. Its validators are cleared, so
+        that the first poll stages every entry not yet imported."""
+        with self._lock:
+            self._db.execute("insert or ignore into feeds (url) values (?)", (url,))
+            self._db.execute(
+                "update feeds set subscribed = 1, nextPoll = ?, failures = 0, "
+                "etag = null, modified = null where url = ?",
+                (self._nextPoll(0), url),
+            )
+            self._db.commit()
+
+    def unsubscribe(self, url):
+        with self._lock:
+            self._db.execute(
+                "update feeds set subscribed = 0, etag = null, modified = null "
+                "where url = ?",
+                (url,),
+            )
+            self._db.execute("delete from staged where feed = ?", (url,))
+            self._db.commit()
+
+    def isSubscribed(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "select 1 from feeds where url = ? and subscribed", (url,)
+            ).fetchone()
+        return bool(row)
+
+    def getSubscriptions(self):
+        with self._lock:
+            rows = self._db.execute(
+                "select url from feeds where subscribed order by url"
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def getDueFeeds(self):
+        with self._lock:
+            rows = self._db.execute(
+                "select url from feeds where subscribed and nextPoll <= ?",
+                (int(time.time()),),
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def scheduleNext(self, url, failed=False):
+        """Schedule the next poll, backing off exponentially after failures."""
+        with self._lock:
+            row = self._db.execute(
+                "select failures from feeds where url = ?", (url,)
+            ).fetchone()
+            failures = row[0] + 1 if failed and row else int(failed)
+            self._db.execute(
+                "update feeds set nextPoll = ?, failures = ? where url = ?",
+                (self._nextPoll(failures), failures, url),
+            )
+            self._db.commit()
+
+    def _nextPoll(self, failures):
+        delay = min(POLL_INTERVAL * 2**failures, MAX_BACKOFF)
+        return int(time.time() + delay * uniform(1 - POLL_JITTER, 1 + POLL_JITTER))
+
+    def stage(self, url, entries):
+        """Keep new entries locally until they are imported."""
+        with self._lock:
+            self._db.executemany(
+                """insert or ignore into staged
+                   select ?, ?, ?
+                   where not exists
+                       (select 1 from entries where feed = ? and link = ?)""",
+                [(url, e["link"], e["title"], url, e["link"]) for e in entries],
+            )
+            self._db.commit()
+
+    def getStaged(self, url):
+        with self._lock:
+            rows = self._db.execute(
+                "select link, title from staged where feed = ? order by rowid", (url,)
+            ).fetchall()
+        return [{"link": link, "title": title} for link, title in rows]
+
+    def countStaged(self):
+        with self._lock:
+            return self._db.execute("select count() from staged").fetchone()[0]
+
+    def unstage(self, url, links):
+        with self._lock:
+            self._db.executemany(
+                "delete from staged where feed = ? and link = ?",
+                [(url, link) for link in links],
+            )
+            self._db.commit()
+
+    def getDownloaded(self, url):
+        """Return the set of links already imported from a feed."""
+        with self._lock:
+            rows = self._db.execute(
+                "select link from entries where feed = ?", (url,)
+            ).fetchall()
+        return {link for (link,) in rows}
+
+    def addEntries(self, url, links, downloaded=None):
+        downloaded = downloaded or int(time.time())
+        with self._lock:
+            self._db.executemany(
+                "insert or ignore into entries values (?, ?, ?)",
+                [(url, link, downloaded) for link in links],
+            )
+            self._db.commit()
+
+    def prune(self, url, currentLinks):
+        """Forget old entries that are no longer listed in the feed."""
+        cutoff = int(time.time()) - FEED_LOG_RETENTION
+        with self._lock:
+            rows = self._db.execute(
+                "select link from entries where feed = ? and downloaded < ?",
+                (url, cutoff),
+            ).fetchall()
+            expired = {link for (link,) in rows} - set(currentLinks)
+            self._db.executemany(
+                "delete from entries where feed = ? and link = ?",
+                [(url, link) for link in expired],
+            )
+            self._db.commit()
+
+
+class FeedPoller:
+    """Check subscribed feeds in the background and stage their new entries.
+
+    Polling uses conditional requests, and each feed's next poll is jittered
+    so that feeds do not all come due at once.
+    """
+
+    def __init__(self, feedLog, parseFeed):
+        self.feedLog = feedLog
+        self.parseFeed = parseFeed
+        self._polling = set()
+        self._executor = ThreadPoolExecutor(max_workers=POLL_WORKERS)
+        self._timer = QTimer(mw)
+        self._timer.timeout.connect(self.pollDue)
+
+    def start(self):
+        self._timer.start(POLL_CHECK_INTERVAL * 1000)
+
+    def stop(self):
+        self._timer.stop()
+        self._executor.shutdown(wait=False)
+
+    def pollDue(self):
+        for url in self.feedLog.getDueFeeds():
+            self.pollSoon(url)
+
+    def pollSoon(self, url):
+        """Poll a feed in the background unless it is already being polled."""
+        if url in self._polling:
+            return
+        self._polling.add(url)
+        future = self._executor.submit(self.poll, url)
+        future.add_done_callback(lambda _: self._polling.discard(url))
+
+    def refresh(self, urls, onDone, label="Refreshing feeds..."):
+        """Poll several feeds concurrently in the background, showing
+        progress, then call onDone with the urls that could not be fetched."""
+        mw.progress.start(label=label, max=len(urls), immediate=True)
+
+        def task():
+            failed = []
+            with ThreadPoolExecutor(max_workers=REFRESH_WORKERS) as executor:
+                futures = {executor.submit(self.poll, url): url for url in urls}
+                for i, future in enumerate(as_completed(futures), start=1):
+                    feed = future.result()
+                    if not feed or feed.get("status") not in [200, 301, 302, 304]:
+                        failed.append(futures[future])
+                    mw.taskman.run_on_main(lambda i=i: mw.progress.update(value=i))
+            return failed
+
+        def done(future):
+            mw.progress.finish()
+            onDone(future.result())
+
+        mw.taskman.run_in_background(task, done)
+
+    def poll(self, url):
+        """Fetch a feed and, if subscribed, stage its new entries.
+
+        Only subscribed feeds are fetched conditionally: their staged entries
+        hold whatever was not imported, so an unchanged feed has nothing new.
+        Safe to call from any thread. Returns the parsed feed, or None if it
+        could not be fetched.
+        """
+        subscribed = self.feedLog.isSubscribed(url)
+        if subscribed:
+            etag, modified = self.feedLog.getValidators(url)
+        else:
+            etag = modified = None
+        try:
+            feed = self.parseFeed(url, etag, modified)
+        except Exception:  # pylint: disable=broad-except
+            feed = None
+
+        status = feed.get("status") if feed else None
+        if status not in [200, 301, 302, 304]:
+            if subscribed:
+                self.feedLog.scheduleNext(url, failed=True)
+            return feed
+
+        if status != 304:
+            entries = [e for e in feed["entries"] if "link" in e]
+            for entry in entries:
+                entry.setdefault("title", entry["link"])
+            self.feedLog.prune(url, [e["link"] for e in entries])
+            if subscribed:
+                self.feedLog.stage(url, entries)
+                self.feedLog.update(url, feed.get("etag", ""), feed.get("modified", ""))
+                self.feedLog.scheduleNext(url)
+            feed["entries"] = entries
+        elif subscribed:
+            self.feedLog.scheduleNext(url)
+
+        return feed
@@ -54,6 +54,7 @@ from .util import (
 
 class SettingsDialog:
     altKeyCheckBox = None
+    articleOnlyCheckBox = None
     bgColorComboBox = None
     boldSeqEditBox = None
     colorPreviewLabel = None
@@ -165,6 +166,7 @@ class SettingsDialog:
         self.settings["editExtract"] = self.editExtractButton.isChecked()
         self.settings["editSource"] = self.editSourceCheckBox.isChecked()
         self.settings["plainText"] = self.plainTextCheckBox.isChecked()
+        self.settings["articleOnly"] = self.articleOnlyCheckBox.isChecked()
         self.settings["copyTitle"] = self.copyTitleCheckBox.isChecked()
         self.settings["scheduleExtract"] = self.scheduleExtractCheckBox.isChecked()
         self.settings["soonRandom"] = self.soonRandomCheckBox.isChecked()
@@ -494,6 +496,7 @@ class SettingsDialog:
         else:
             self.settings["quickKeys"][target]["extractBgColor"] = bgColor
             self.settings["quickKeys"][target]["extractTextColor"] = textColor
+            self.settings.markDirty()
 
     def _getHighlightGroupBox(self):
         self.targetComboBox = QComboBox()
@@ -970,6 +973,7 @@ class SettingsDialog:
         keyCombo = self.quickKeysComboBox.currentText()
         if keyCombo:
             self.settings["quickKeys"].pop(keyCombo)
+            self.settings.markDirty()
             removeComboBoxItem(self.quickKeysComboBox, keyCombo)
             self._clearQuickKeysTab()
             self._populateTargetComboBox()
@@ -1023,6 +1027,7 @@ class SettingsDialog:
             tooltip("New shortcut added: %s" % keyCombo)
 
         self.settings["quickKeys"][keyCombo] = settings
+        self.settings.markDirty()
         setComboBoxItem(self.quickKeysComboBox, keyCombo)
         self._populateTargetComboBox()
         self.settings.loadMenuItems()
@@ -1124,9 +1129,13 @@ class SettingsDialog:
         sourceFormatLayout.addStretch()
         sourceFormatLayout.addWidget(self.sourceFormatEditBox)
 
+        self.articleOnlyCheckBox = QCheckBox("Keep Only Main Article Content")
+        self.articleOnlyCheckBox.setChecked(self.settings["articleOnly"])
+
         layout = QVBoxLayout()
         layout.addLayout(importDeckLayout)
         layout.addLayout(sourceFormatLayout)
+        layout.addWidget(self.articleOnlyCheckBox)
         layout.addStretch()
 
         tab = QWidget()
@@ -13,16 +13,29 @@
 # OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
 # PERFORMANCE OF THIS SOFTWARE.
 
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
 from mimetypes import guess_extension
+from threading import Lock, Semaphore
 from urllib.error import HTTPError
 from urllib.parse import SplitResult, quote, urlsplit, urlunsplit
 
+from anki.hooks import addHook
 from anki.notes import Note
 from anki.utils import checksum
 from aqt import mw
-from aqt.utils import chooseList, getText, showCritical, showInfo, showWarning, tooltip
-from bs4 import BeautifulSoup, Comment
+from aqt.utils import (
+    askUser,
+    chooseList,
+    getText,
+    showCritical,
+    showInfo,
+    showWarning,
+    tooltip,
+)
+from bs4 import BeautifulSoup
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QAbstractItemView,
@@ -32,13 +45,24 @@ from PyQt5.QtWidgets import (
     QListWidgetItem,
     QVBoxLayout,
 )
-from requests import get
-from requests.exceptions import ConnectionError, InvalidSchema
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RequestException, Timeout
 
+from .feeds import FeedLog, FeedPoller, getFeedLogPath, parseEntries
 from .lib.feedparser import parse
+from .media import MediaIndex
 from .pocket import Pocket
+from .readability import extractArticle
+from .sanitize import SOUP_FEATURES, sanitize
 from .util import setField
 
+PAGE_WORKERS = 4
+IMAGE_WORKERS = 8
+IMAGES_PER_HOST = 4
+REQUEST_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
 
 class ImporterError(Exception):
     pass
@@ -46,23 +70,130 @@ class ImporterError(Exception):
 
 class Importer:
     pocket = None
-
-    def _fetchWebpage(self, url):
+    session = None
+    mediaIndex = None
+    feedLog = None
+    feedPoller = None
+    imageExecutor = None
+    _hostLimits = None
+    _mediaIndexLock = Lock()
+    _imageLock = Lock()
+
+    def __init__(self):
+        addHook("unloadProfile", self.stopFeedPoller)
+
+    def _getSession(self):
+        if not self.session:
+            self.session = Session()
+            adapter = HTTPAdapter(pool_maxsize=IMAGE_WORKERS)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        return self.session
+
+    def _getMediaIndex(self):
+        # image downloads run concurrently, so only one thread may open it
+        with self._mediaIndexLock:
+            path = os.path.join(mw.pm.profileFolder(), "ir_media.db")
+            if not self.mediaIndex or self.mediaIndex.path != path:
+                self.mediaIndex = MediaIndex(path, mw.col.media.dir())
+            return self.mediaIndex
+
+    def _getImageExecutor(self):
+        # shared by every article, so that concurrent articles stay within
+        # IMAGE_WORKERS downloads, and IMAGES_PER_HOST for any one host
+        with self._imageLock:
+            if not self.imageExecutor:
+                self.imageExecutor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS)
+                self._hostLimits = defaultdict(lambda: Semaphore(IMAGES_PER_HOST))
+            return self.imageExecutor
+
+    def _getHostLimit(self, host):
+        with self._imageLock:
+            return self._hostLimits[host]
+
+    def _getFeedLog(self):
+        path = getFeedLogPath()
+        if not self.feedLog or self.feedLog.path != path:
+            self.feedLog = FeedLog(path)
+            if self.settings["feedLog"]:
+                self.feedLog.migrate(self.settings["feedLog"])
+                self.settings["feedLog"] = {}
+        return self.feedLog
+
+    def _parseFeed(self, url, etag=None, modified=None):
+        """Download a feed with a conditional request and parse the body.
+
+        The download goes through the shared session, so feeds refreshed in
+        parallel reuse its connection pool instead of opening their own.
+        """
         headers = {"User-Agent": self.settings["userAgent"]}
-        html = get(url, headers=headers).content
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
 
-        webpage = BeautifulSoup(html, "html.parser")
+        response = self._getSession().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code != 200:
+            feed = {"entries": [], "bozo": 0}
+        else:
+            feed = parseEntries(response.content, response.url)
+
+        if feed is None:
+            # not well-formed, so leave it to feedparser's lenient parser; the
+            # body has already been decompressed by requests
+            responseHeaders = {
+                k: v
+                for k, v in response.headers.items()
+                if k.lower() != "content-encoding"
+            }
+            feed = parse(response.content, response_headers=responseHeaders)
+        else:
+            feed["etag"] = response.headers.get("ETag", "")
+            feed["modified"] = response.headers.get("Last-Modified", "")
 
-        for tagName in self.settings["badTags"]:
-            for tag in webpage.find_all(tagName):
-                tag.decompose()
+        feed["status"] = response.status_code
+        feed["href"] = response.url
+        return feed
 
-        for c in webpage.find_all(text=lambda s: isinstance(s, Comment)):
-            c.extract()
+    def _getFeedPoller(self):
+        if not self.feedPoller or self.feedPoller.feedLog is not self._getFeedLog():
+            self.stopFeedPoller()
+            self.feedPoller = FeedPoller(self._getFeedLog(), self._parseFeed)
+        return self.feedPoller
+
+    def startFeedPoller(self):
+        self.stopFeedPoller()
+        self._getFeedPoller().start()
+
+    def stopFeedPoller(self):
+        if self.feedPoller:
+            self.feedPoller.stop()
+            self.feedPoller = None
+
+    def _fetchWebpage(self, url):
+        headers = {"User-Agent": self.settings["userAgent"]}
+        session = self._getSession()
+        with session.get(
+            url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True
+        ) as response:
+            html = sanitize(
+                response.iter_content(chunk_size=CHUNK_SIZE),
+                self.settings["badTags"],
+                response.headers.get("content-type", ""),
+            )
 
-        return webpage
+        return BeautifulSoup(html, SOUP_FEATURES)
 
     def _createNote(self, title, text, source, priority=None):
+        return self._createNotes([(title, text, source, priority)])
+
+    def _createNotes(self, articles):
+        """Add (title, text, source, priority) notes as a single operation.
+
+        The deck and model are looked up once, and the deck browser is only
+        refreshed after the last note has been added.
+        """
         if self.settings["importDeck"]:
             deck = mw.col.decks.byName(self.settings["importDeck"])
             if not deck:
@@ -75,14 +206,18 @@ class Importer:
             did = mw.col.conf["curDeck"]
 
         model = mw.col.models.byName(self.settings["modelName"])
-        note = Note(mw.col, model)
-        setField(note, self.settings["titleField"], title)
-        setField(note, self.settings["textField"], text)
-        setField(note, self.settings["sourceField"], source)
-        if priority:
-            setField(note, self.settings["prioField"], priority)
-        note.model()["did"] = did
-        mw.col.addNote(note)
+        model["did"] = did
+        mw.checkpoint("Import")
+
+        for title, text, source, priority in articles:
+            note = Note(mw.col, model)
+            setField(note, self.settings["titleField"], title)
+            setField(note, self.settings["textField"], text)
+            setField(note, self.settings["sourceField"], source)
+            if priority:
+                setField(note, self.settings["prioField"], priority)
+            mw.col.addNote(note)
+
         mw.deckBrowser.show()
         return mw.col.decks.get(did)["name"]
 
@@ -101,20 +236,43 @@ class Importer:
             showCritical("Only HTTP requests are supported.")
             return
 
+        webpage, images = self._getArticle(url, lambda: self._fetchArticle(url))
+        deck = self._createNote(*self._prepareArticle(url, webpage, images, priority))
+
+        if not silent:
+            tooltip("Added to deck: {}".format(deck))
+
+        return deck
+
+    def _fetchArticle(self, url):
+        # network stages only, so this can run off the main thread
+        webpage = self._fetchWebpage(url)
+        if self.settings["articleOnly"]:
+            extractArticle(webpage)
+        return webpage, self._fetchImages(webpage, url)
+
+    def _getArticle(self, url, fetch):
         try:
-            webpage = self._fetchWebpage(url)
+            return fetch()
         except HTTPError as error:
             showWarning(
                 "The remote server has returned an error: "
                 "HTTP Error {} ({})".format(error.code, error.reason)
             )
             raise ImporterError
-        except ConnectionError as error:
+        except (ConnectionError, Timeout) as error:
             showWarning(f"There was a problem connecting to the website. ({url})")
             raise ImporterError
+        except RequestException as error:
+            showWarning(f"The webpage could not be downloaded: {error} ({url})")
+            raise ImporterError
+        except Exception as error:  # pylint: disable=broad-except
+            showWarning(f"The webpage could not be read: {error!r} ({url})")
+            raise ImporterError
 
-        for img in webpage.find_all("img"):
-            self._downloadImage(img, url)
+    def _prepareArticle(self, url, webpage, images, priority=None):
+        """Return the (title, text, source, priority) fields for a note."""
+        self._storeImages(images)
 
         try:
             body = "\n".join(map(str, webpage.find("body").children))
@@ -126,43 +284,134 @@ class Importer:
             date=date.today(), url='<a href="%s">%s</a>' % (url, url)
         )
 
+        if webpage.title and webpage.title.string:
+            title = webpage.title.string
+        else:
+            title = "Placeholder Title"
+
         if self.settings["prioEnabled"] and not priority:
-            priority = self._getPriority(webpage.title.string)
+            priority = self._getPriority(title)
 
-        if webpage.title is None:
-            webpage.title = "Placeholder Title"
+        return title, body, source, priority
+
+    def _importArticles(self, urls, priority, label):
+        """Fetch the articles concurrently, then add them as notes in their
+        original order on the main thread. Returns the deck name and imported
+        urls."""
+        fetched = {}
+        deck = None
+        mw.progress.start(label=label, max=len(urls), immediate=True)
 
         try:
-            deck = self._createNote(webpage.title.string, body, source, priority)
-        except AttributeError:
-            raise ImporterError
+            with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+                futures = {executor.submit(self._fetchArticle, u): u for u in urls}
+                for i, future in enumerate(as_completed(futures), start=1):
+                    url = futures[future]
+                    try:
+                        fetched[url] = self._getArticle(url, future.result)
+                    except ImporterError:
+                        pass
+                    mw.progress.update(value=i)
 
-        if not silent:
-            tooltip("Added to deck: {}".format(deck))
+            articles = []
+            imported = []
+            for url in urls:
+                if url not in fetched:
+                    continue
+                webpage, images = fetched.pop(url)
+                try:
+                    articles.append(
+                        self._prepareArticle(url, webpage, images, priority)
+                    )
+                except ImporterError:
+                    continue
+                imported.append(url)
+
+            if articles:
+                deck = self._createNotes(articles)
+            if not deck:
+                imported = []
+        finally:
+            mw.progress.finish()
 
-        return deck
+        return deck, imported
 
-    def _downloadImage(self, img, articleUrl):
-        try:
-            imgAddress = img["src"]
-            split = urlsplit(articleUrl)
-            if imgAddress.startswith("//"):
-                imgAddress = "http:" + imgAddress
-            elif not urlsplit(imgAddress).scheme:
-                imgAddress = urlunsplit(
-                    SplitResult(split.scheme, split.netloc, imgAddress, "", "")
+    def _fetchImages(self, webpage, articleUrl):
+        images = {}
+        for img in webpage.find_all("img"):
+            if img.get("src"):
+                address = self._getImageAddress(img["src"], articleUrl)
+                images.setdefault(address, []).append(img)
+
+        if not images:
+            return []
+
+        def download(address):
+            with self._getHostLimit(urlsplit(address).netloc):
+                return self._downloadImage(address, articleUrl)
+
+        results = self._getImageExecutor().map(download, images)
+        return list(zip(images.items(), results))
+
+    def _storeImages(self, images):
+        # the collection is not thread-safe, so media is written on the main
+        # thread once every download has finished
+        for (address, imgs), result in images:
+            if not result:
+                continue
+            fileName, data, headers = result
+            if data is not None:
+                fileName = mw.col.media.writeData(fileName, data)
+                self._getMediaIndex().add(
+                    address,
+                    fileName,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
                 )
+            for img in imgs:
+                img["src"] = quote(fileName.encode("utf8"))
+
+    def _getImageAddress(self, imgAddress, articleUrl):
+        split = urlsplit(articleUrl)
+        if imgAddress.startswith("//"):
+            return "http:" + imgAddress
+        if not urlsplit(imgAddress).scheme:
+            return urlunsplit(
+                SplitResult(split.scheme, split.netloc, imgAddress, "", "")
+            )
+        return imgAddress
+
+    def _downloadImage(self, imgAddress, articleUrl):
+        headers = {"Referer": articleUrl.encode("utf8")}
+        mediaIndex = self._getMediaIndex()
+        cached = mediaIndex.get(imgAddress)
+        if cached:
+            fileName, etag, modified, _ = cached
+            if mediaIndex.isFresh(cached):
+                return fileName, None, None
+            if etag:
+                headers["If-None-Match"] = etag
+            if modified:
+                headers["If-Modified-Since"] = modified
+
+        try:
+            response = self._getSession().get(
+                imgAddress, headers=headers, timeout=REQUEST_TIMEOUT
+            )
+            if cached and response.status_code == 304:
+                mediaIndex.touch(imgAddress)
+                return cached[0], None, None
+            if not response.ok:
+                return None
 
-            response = get(imgAddress, headers={"Referer": articleUrl.encode("utf8")})
             data = response.content
             ext = guess_extension(
                 response.headers["content-type"].partition(";")[0].strip()
             )
             fileName = "paste-ir-{}.{}".format(checksum(data), ext)
-            mw.col.media.writeData(fileName, data)
-            img["src"] = quote(fileName.encode("utf8"))
-        except (KeyError, InvalidSchema, ConnectionError):
-            pass
+            return fileName, data, response.headers
+        except (KeyError, RequestException):
+            return None
 
     def _getPriority(self, name=None):
         if name:
@@ -182,35 +431,34 @@ class Importer:
         if not urlsplit(url).scheme:
             url = "http://" + url
 
-        log = self.settings["feedLog"]
+        feedLog = self._getFeedLog()
 
-        try:
-            feed = parse(
-                url,
-                agent=self.settings["userAgent"],
-                etag=log[url]["etag"],
-                modified=log[url]["modified"],
-            )
-        except KeyError:
-            log[url] = {"downloaded": []}
-            feed = parse(url, agent=self.settings["userAgent"])
+        if feedLog.isSubscribed(url):
+            # show what the background poller already found, and look for
+            # anything newer without keeping the dialog waiting
+            newEntries = feedLog.getStaged(url)
+            self._getFeedPoller().pollSoon(url)
+        else:
+            feed = self._getFeedPoller().poll(url)
 
-        if feed["status"] not in [200, 301, 302]:
-            showWarning(
-                "The remote server has returned an unexpected status: "
-                "{}".format(feed["status"])
-            )
+            if not feed or feed.get("status") not in [200, 301, 302, 304]:
+                showWarning(
+                    "The remote server has returned an unexpected status: "
+                    "{}".format(feed.get("status") if feed else None)
+                )
+                return
+
+            downloaded = feedLog.getDownloaded(url)
+            newEntries = [
+                e for e in feed.get("entries", []) if e["link"] not in downloaded
+            ]
 
         if self.settings["prioEnabled"]:
             priority = self._getPriority()
         else:
             priority = None
 
-        entries = [
-            {"text": e["title"], "data": e}
-            for e in feed["entries"]
-            if e["link"] not in log[url]["downloaded"]
-        ]
+        entries = [{"text": e["title"], "data": e} for e in newEntries]
 
         if not entries:
             showInfo("There are no new items in this feed.")
@@ -221,24 +469,70 @@ class Importer:
         if not selected:
             return
 
-        n = len(selected)
+        deck, imported = self._importArticles(
+            [entry["link"] for entry in selected],
+            priority,
+            "Importing feed entries...",
+        )
+        feedLog.addEntries(url, imported)
+        feedLog.unstage(url, imported)
 
-        mw.progress.start(label="Importing feed entries...", max=n, immediate=True)
+        if not imported:
+            tooltip("Failed to import Feeds")
+            return
 
-        try:
-            for i, entry in enumerate(selected, start=1):
-                deck = self.importWebpage(entry["link"], priority, True)
-                log[url]["downloaded"].append(entry["link"])
-                mw.progress.update(value=i)
+        tooltip("Added {} item(s) to deck: {}".format(len(imported), deck))
 
-            log[url]["etag"] = feed.etag if hasattr(feed, "etag") else ""
-            log[url]["modified"] = feed.modified if hasattr(feed, "modified") else ""
+        if not feedLog.isSubscribed(url) and askUser(
+            "Check this feed for new items in the background?"
+        ):
+            feedLog.subscribe(url)
+            self._getFeedPoller().start()
 
-            mw.progress.finish()
-            tooltip("Added {} item(s) to deck: {}".format(n, deck))
-        except ImporterError:
-            mw.progress.finish()
-            tooltip("Failed to import Feeds")
+    def refreshFeeds(self):
+        feedLog = self._getFeedLog()
+        urls = feedLog.getSubscriptions()
+
+        if not urls:
+            showInfo("You are not subscribed to any feeds.")
+            return
+
+        staged = feedLog.countStaged()
+
+        def onDone(failed):
+            if failed:
+                showWarning(
+                    "The following feeds could not be refreshed:\n\n"
+                    + "\n".join(failed)
+                )
+
+            tooltip(
+                "Found {} new item(s) in {} feed(s)".format(
+                    feedLog.countStaged() - staged, len(urls)
+                )
+            )
+
+        self._getFeedPoller().refresh(urls, onDone)
+
+    def manageFeeds(self):
+        feedLog = self._getFeedLog()
+        subscriptions = [
+            {"text": url, "data": url} for url in feedLog.getSubscriptions()
+        ]
+
+        if not subscriptions:
+            showInfo("You are not subscribed to any feeds.")
+            return
+
+        selected = self._select(subscriptions)
+
+        if not selected:
+            return
+
+        for url in selected:
+            feedLog.unsubscribe(url)
+
+        tooltip("Unsubscribed from {} feed(s)".format(len(selected)))
 
     def importPocket(self):
         if not self.pocket:
@@ -255,25 +549,32 @@ class Importer:
         else:
             priority = None
 
-        try:
-            if selected:
-                n = len(selected)
-
-                mw.progress.start(
-                    label="Importing Pocket articles...", max=n, immediate=True
-                )
+        if not selected:
+            return
 
-                for i, article in enumerate(selected, start=1):
-                    deck = self.importWebpage(article["given_url"], priority, True)
-                    if self.settings["pocketArchive"]:
-                        self.pocket.archive(article)
-                    mw.progress.update(value=i)
+        articles = {a["given_url"]: a for a in selected}
+        deck, imported = self._importArticles(
+            list(articles), priority, "Importing Pocket articles..."
+        )
 
-                mw.progress.finish()
-                tooltip("Added {} item(s) to deck: {}".format(n, deck))
-        except ImporterError:
-            mw.progress.finish()
+        if not imported:
             tooltip("Failed to import Articles")
+            return
+
+        if self.settings["pocketArchive"]:
+            with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+                futures = {
+                    executor.submit(self.pocket.archive, articles[u]): u
+                    for u in imported
+                }
+            failed = [futures[f] for f in futures if f.exception()]
+            if failed:
+                showWarning(
+                    "The following articles could not be archived in Pocket:\n\n"
+                    + "\n".join(failed)
+                )
+
+        tooltip("Added {} item(s) to deck: {}".format(len(imported), deck))
 
     def _select(self, choices):
         if not choices:
@@ -133,6 +133,7 @@ ACCEPTABLE_URI_SCHEMES = (
 import codecs
 import copy
 import datetime
+import functools
 import itertools
 import re
 import struct
@@ -2959,9 +2960,27 @@ def _parse_psc_chapter_start(start):
     return datetime.timedelta(0, h*60*60 + m*60 + s, ms*1000)
 
 _date_handlers = []
+# Feeds repeat the same dates on every refresh. The result depends only on
+# the string and the registered handlers, so the cache is cleared whenever a
+# handler is registered.
+@functools.lru_cache(maxsize=4096)
+def _parse_date_cached(dateString):
+    for handler in _date_handlers:
+        try:
+            date9tuple = handler(dateString)
+        except (KeyError, OverflowError, ValueError):
+            continue
+        if not date9tuple:
+            continue
+        if len(date9tuple) != 9:
+            continue
+        return date9tuple
+    return None
+
 def registerDateHandler(func):
     '''Register a date handler function (takes string, returns 9-tuple date in GMT)'''
     _date_handlers.insert(0, func)
+    _parse_date_cached.cache_clear()
 
 # ISO-8601 date parsing routines written by Fazal Majid.
 # The ISO 8601 standard is very convoluted and irregular - a full ISO 8601
@@ -3447,17 +3466,7 @@ def _parse_date(dateString):
     '''Parses a variety of date formats into a 9-tuple in GMT'''
     if not dateString:
         return None
-    for handler in _date_handlers:
-        try:
-            date9tuple = handler(dateString)
-        except (KeyError, OverflowError, ValueError):
-            continue
-        if not date9tuple:
-            continue
-        if len(date9tuple) != 9:
-            continue
-        return date9tuple
-    return None
+    return _parse_date_cached(dateString)
 
 # Each marker represents some of the characters of the opening XML
 # processing instruction ('<?xm') in the specified encoding.
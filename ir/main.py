@@ -18,6 +18,8 @@
 
 # pylint: disable=import-error,invalid-name,no-name-in-module,no-member,protected-access,missing-docstring
 
+import os
+from contextlib import closing
 from functools import partial
 
 import sip
@@ -28,8 +30,8 @@ from aqt.browser import Browser
 from aqt.reviewer import Reviewer
 
 from .about import showAbout
+from .feeds import FeedLog, getFeedLogPath
 from .gui import SettingsDialog
-from .importer import Importer
 from .schedule import Scheduler
 from .settings import SettingsManager
 from .text import TextManager
@@ -39,9 +41,9 @@ from .view import ViewManager
 
 class ReadingManager:
     shortcuts = []
+    _importer = None
 
     def __init__(self):
-        self.importer = Importer()
         self.scheduler = Scheduler()
         self.textManager = TextManager()
         self.viewManager = ViewManager()
@@ -60,7 +62,6 @@ class ReadingManager:
     def onProfileLoaded(self):
         self.settings = SettingsManager()
         mw.addonManager.setConfigAction(__name__, lambda: SettingsDialog(self.settings))
-        self.importer.settings = self.settings
         self.scheduler.settings = self.settings
         self.textManager.settings = self.settings
         self.viewManager.settings = self.settings
@@ -95,6 +96,29 @@ class ReadingManager:
             ),
         ]
 
+        # the importer is loaded on first use, or now if feeds need polling
+        if self._importer or self._hasSubscriptions():
+            self.importer.startFeedPoller()
+
+    def _hasSubscriptions(self):
+        # most profiles never use feeds, so the feed log is not created here
+        path = getFeedLogPath()
+        if not os.path.isfile(path):
+            return False
+        with closing(FeedLog(path)) as feedLog:
+            return bool(feedLog.getSubscriptions())
+
+    @property
+    def importer(self):
+        # requests, bs4 and feedparser are slow to import, and most sessions
+        # never import anything
+        if not self._importer:
+            from .importer import Importer
+
+            self._importer = Importer()
+        self._importer.settings = self.settings
+        return self._importer
+
     def loadMenuItems(self):
         if hasattr(mw, "customMenus") and "Read" in mw.customMenus:
             mw.customMenus["Read"].clear()
@@ -106,9 +130,17 @@ class ReadingManager:
             "Alt+1",
         )
         addMenuItem("Read", "Organizer...", self.scheduler.showDialog, "Alt+2")
-        addMenuItem("Read", "Import Webpage", self.importer.importWebpage, "Alt+3")
-        addMenuItem("Read", "Import Feed", self.importer.importFeed, "Alt+4")
-        addMenuItem("Read", "Import Pocket", self.importer.importPocket, "Alt+5")
+        addMenuItem(
+            "Read", "Import Webpage", lambda: self.importer.importWebpage(), "Alt+3"
+        )
+        addMenuItem("Read", "Import Feed", lambda: self.importer.importFeed(), "Alt+4")
+        addMenuItem(
+            "Read", "Import Pocket", lambda: self.importer.importPocket(), "Alt+5"
+        )
+        addMenuItem("Read", "Refresh Feeds", lambda: self.importer.refreshFeeds())
+        addMenuItem(
+            "Read", "Feed Subscriptions...", lambda: self.importer.manageFeeds()
+        )
         addMenuItem("Read", "Zoom In", self.viewManager.zoomIn, "Ctrl++")
         addMenuItem("Read", "Zoom Out", self.viewManager.zoomOut, "Ctrl+-")
         addMenuItem("Read", "About...", showAbout)
@@ -244,10 +276,12 @@ def buttonTime(self, i, _old):
 
 
 def onBrowserClosed(_):
+    # cards may have been edited, moved or suspended from the browser
+    mw.readingManager.scheduler.clearCardInfoCache()
     try:
         mw.readingManager.scheduler._updateListItems()
     except RuntimeError:
-        # Catches this error. I think the browser is deleting the cardListWidget
+        # Catches this error. I think the browser is deleting the cardListView
         # before the hook is called in some cases.
         #         Traceback (most recent call last):
         #   File "aqt/webview.py", line 493, in handler
@@ -0,0 +1,75 @@
+# Copyright 2017-2019 Joseph Lorimer <joseph@lorimer.me>
+#
+# Permission to use, copy, modify, and distribute this software for any purpose
+# with or without fee is hereby granted, provided that the above copyright
+# notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import os
+import sqlite3
+import time
+from threading import Lock
+
+# cached images are used without contacting the server for this long
+REVALIDATE_AFTER = 7 * 24 * 60 * 60
+
+
+class MediaIndex:
+    """Map image URLs to the media files they were imported as.
+
+    Lookups and updates are safe to call from the image download threads.
+    """
+
+    def __init__(self, path, mediaDir):
+        self.path = path
+        self.mediaDir = mediaDir
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """create table if not exists media (
+                   url text primary key,
+                   filename text not null,
+                   etag text,
+                   modified text,
+                   checked integer not null
+               )"""
+        )
+        self._db.commit()
+
+    def get(self, url):
+        """Return (filename, etag, modified, checked) for a URL whose media
+        file still exists, otherwise None."""
+        with self._lock:
+            entry = self._db.execute(
+                "select filename, etag, modified, checked from media where url = ?",
+                (url,),
+            ).fetchone()
+
+        if entry and os.path.isfile(os.path.join(self.mediaDir, entry[0])):
+            return entry
+        return None
+
+    def isFresh(self, entry):
+        return time.time() - entry[3] < REVALIDATE_AFTER
+
+    def add(self, url, fileName, etag=None, modified=None):
+        with self._lock:
+            self._db.execute(
+                "insert or replace into media values (?, ?, ?, ?, ?)",
+                (url, fileName, etag, modified, int(time.time())),
+            )
+            self._db.commit()
+
+    def touch(self, url):
+        with self._lock:
+            self._db.execute(
+                "update media set checked = ? where url = ?", (int(time.time()), url)
+            )
+            self._db.commit()
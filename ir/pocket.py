@@ -96,7 +96,7 @@ class Pocket:
             return None
 
     def archive(self, article):
-        post(
+        response = post(
             "https://getpocket.com/v3/send",
             json={
                 "consumer_key": self.consumerKey,
@@ -104,3 +104,4 @@ class Pocket:
                 "actions": [{"action": "archive", "item_id": article["item_id"]}],
             },
         )
+        response.raise_for_status()
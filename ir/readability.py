@@ -0,0 +1,151 @@
+# Copyright 2017-2019 Joseph Lorimer <joseph@lorimer.me>
+#
+# Permission to use, copy, modify, and distribute this software for any purpose
+# with or without fee is hereby granted, provided that the above copyright
+# notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+"""Keep only the main article of a webpage, in the spirit of Readability.
+
+Paragraph-like blocks are scored by their length and number of commas, and
+the score is credited to their parent and grandparent. The best-scoring
+container, adjusted for link density, is kept along with any siblings that
+score nearly as well.
+"""
+
+import re
+
+BOILERPLATE_TAGS = ["aside", "footer", "form", "header", "nav", "noscript"]
+PARAGRAPH_TAGS = ["p", "pre", "td"]
+UNLIKELY = re.compile(
+    r"banner|breadcrumb|combx|comment|community|disqus|footer|header|menu|"
+    r"modal|nav|popup|related|remark|rss|share|shoutbox|sidebar|social|"
+    r"sponsor|ad-break|agegate|pagination|pager",
+    re.IGNORECASE,
+)
+POSITIVE = re.compile(
+    r"article|body|content|entry|hentry|main|page|post|story|text|blog",
+    re.IGNORECASE,
+)
+TAG_WEIGHTS = {
+    "article": 10,
+    "div": 5,
+    "section": 5,
+    "blockquote": 3,
+    "pre": 3,
+    "td": 3,
+    "form": -3,
+    "ol": -3,
+    "ul": -3,
+    "h1": -5,
+    "h2": -5,
+    "h3": -5,
+    "h4": -5,
+    "h5": -5,
+    "h6": -5,
+    "th": -5,
+}
+MIN_PARAGRAPH_LENGTH = 25
+MIN_ARTICLE_LENGTH = 250
+
+
+def extractArticle(webpage):
+    """Replace the body of the webpage with its main content.
+
+    Returns False if no convincing article could be found, in which case only
+    obvious boilerplate has been removed.
+    """
+    body = webpage.find("body")
+    if body is None:
+        return False
+
+    candidates = _scoreCandidates(body)
+    if not candidates:
+        return False
+
+    top, topScore = max(candidates.values(), key=lambda candidate: candidate[1])
+    if len(top.get_text(" ", strip=True)) < MIN_ARTICLE_LENGTH:
+        return False
+
+    if top is body:
+        return True
+
+    threshold = max(10, topScore * 0.2)
+    keep = [
+        sibling
+        for sibling in top.parent.find_all(recursive=False)
+        if sibling is top
+        or candidates.get(id(sibling), (None, 0))[1] >= threshold
+        or _isStandaloneParagraph(sibling)
+    ]
+
+    for tag in keep:
+        tag.extract()
+    body.clear()
+    for tag in keep:
+        body.append(tag)
+    return True
+
+
+def _scoreCandidates(body):
+    for tag in body.find_all(BOILERPLATE_TAGS):
+        tag.extract()
+
+    for tag in body.find_all(True):
+        if tag.name in ["article", "main"]:
+            continue
+        names = " ".join(tag.get("class", [])) + " " + tag.get("id", "")
+        if UNLIKELY.search(names) and not POSITIVE.search(names):
+            tag.extract()
+
+    # keyed by id, since tags compare and hash by their contents
+    candidates = {}
+    for paragraph in body.find_all(PARAGRAPH_TAGS):
+        text = paragraph.get_text(" ", strip=True)
+        if len(text) < MIN_PARAGRAPH_LENGTH:
+            continue
+
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        ancestors = [(paragraph.parent, 1), (paragraph.parent.parent, 2)]
+        for ancestor, share in ancestors:
+            if ancestor is None or ancestor.name in ["[document]", "html"]:
+                continue
+            if id(ancestor) not in candidates:
+                candidates[id(ancestor)] = [ancestor, _initialScore(ancestor)]
+            candidates[id(ancestor)][1] += score / share
+
+    for candidate in candidates.values():
+        candidate[1] *= 1 - _linkDensity(candidate[0])
+    return candidates
+
+
+def _initialScore(tag):
+    score = TAG_WEIGHTS.get(tag.name, 0)
+    names = " ".join(tag.get("class", [])) + " " + tag.get("id", "")
+    if POSITIVE.search(names):
+        score += 25
+    if UNLIKELY.search(names):
+        score -= 25
+    return score
+
+
+def _linkDensity(tag):
+    textLength = len(tag.get_text(strip=True))
+    if not textLength:
+        return 1
+    linkLength = sum(len(a.get_text(strip=True)) for a in tag.find_all("a"))
+    return min(1, linkLength / textLength)
+
+
+def _isStandaloneParagraph(tag):
+    if tag.name != "p":
+        return False
+    text = tag.get_text(" ", strip=True)
+    return len(text) > 80 and _linkDensity(tag) < 0.25
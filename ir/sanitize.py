@@ -0,0 +1,165 @@
+# Copyright 2017-2019 Joseph Lorimer <joseph@lorimer.me>
+#
+# Permission to use, copy, modify, and distribute this software for any purpose
+# with or without fee is hereby granted, provided that the above copyright
+# notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+# REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY
+# AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+# INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+# LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+# OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+# PERFORMANCE OF THIS SOFTWARE.
+
+import codecs
+import re
+from html.parser import HTMLParser
+
+from bs4.dammit import EncodingDetector
+
+try:
+    import lxml  # pylint: disable=unused-import
+
+    SOUP_FEATURES = "lxml"
+except ImportError:
+    SOUP_FEATURES = "html.parser"
+
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+CHARSET_PATTERN = re.compile(rb"""charset=["']?([\w.:-]+)""", re.IGNORECASE)
+PREFIX_SIZE = 2048
+
+
+class HtmlSanitizer(HTMLParser):
+    """Copy HTML through as it is fed, dropping comments and unwanted tags.
+
+    Content inside a dropped tag is discarded along with it, so the page
+    never has to be held or parsed in full before it is cleaned.
+    """
+
+    def __init__(self, badTags):
+        super().__init__(convert_charrefs=False)
+        self.badTags = set(badTags)
+        self.parts = []
+        self._open = []
+        self._skipFrom = None
+
+    def getHtml(self):
+        return "".join(self.parts)
+
+    def _write(self, text):
+        if self._skipFrom is None:
+            self.parts.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if self._skipFrom is None and tag in self.badTags:
+            if tag not in VOID_ELEMENTS:
+                self._skipFrom = len(self._open)
+                self._open.append(tag)
+            return
+        self._write(self.get_starttag_text())
+        if tag not in VOID_ELEMENTS:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in self.badTags:
+            self._write(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if tag in self._open:
+            # closing an element also closes anything left open inside it,
+            # including a dropped tag that was never closed itself
+            i = len(self._open) - 1 - self._open[::-1].index(tag)
+            del self._open[i:]
+            if self._skipFrom is not None and i <= self._skipFrom:
+                dropped = i == self._skipFrom
+                self._skipFrom = None
+                if dropped:
+                    return
+        elif tag in self.badTags:
+            return
+        self._write("</%s>" % tag)
+
+    def handle_data(self, data):
+        self._write(data)
+
+    def handle_entityref(self, name):
+        self._write("&%s;" % name)
+
+    def handle_charref(self, name):
+        self._write("&#%s;" % name)
+
+    def handle_decl(self, decl):
+        self._write("<!%s>" % decl)
+
+    def unknown_decl(self, data):
+        self._write("<![%s]>" % data)
+
+
+def _detectEncoding(prefix, contentType):
+    match = CHARSET_PATTERN.search(contentType.encode("latin-1", "ignore"))
+    if match:
+        candidates = [match.group(1).decode("ascii")]
+    else:
+        _, bom = EncodingDetector.strip_byte_order_mark(prefix)
+        if bom:
+            # these codecs read and drop the byte order mark themselves
+            return "utf-8-sig" if bom == "utf-8" else bom[:6]
+        candidates = []
+    candidates.extend(EncodingDetector(prefix, is_html=True).encodings)
+
+    for encoding in candidates:
+        try:
+            # the prefix may end partway through a character
+            codecs.getincrementaldecoder(encoding)().decode(prefix)
+        except (LookupError, UnicodeDecodeError):
+            continue
+        # a plain ASCII prefix says nothing about the rest of the page
+        return "utf-8" if codecs.lookup(encoding).name == "ascii" else encoding
+
+    return "utf-8"
+
+
+def sanitize(chunks, badTags, contentType=""):
+    """Return cleaned HTML from an iterable of raw byte chunks.
+
+    The encoding is taken from the Content-Type header or, failing that,
+    detected from the start of the page.
+    """
+    sanitizer = HtmlSanitizer(badTags)
+    decoder = None
+    prefix = b""
+
+    for chunk in chunks:
+        if decoder is None:
+            prefix += chunk
+            if len(prefix) < PREFIX_SIZE:
+                continue
+            encoding = _detectEncoding(prefix, contentType)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            chunk, prefix = prefix, b""
+        sanitizer.feed(decoder.decode(chunk))
+
+    if decoder is None:
+        encoding = _detectEncoding(prefix, contentType)
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        sanitizer.feed(decoder.decode(prefix))
+
+    sanitizer.feed(decoder.decode(b"", final=True))
+    sanitizer.close()
+    return sanitizer.getHtml()
@@ -19,21 +19,23 @@
 
 # pylint: disable=import-error,invalid-name,no-name-in-module,no-member,protected-access,missing-docstring
 
+from bisect import bisect_left
 from random import gauss, shuffle
 from re import sub
 
+from anki import hooks
 from anki.consts import QUEUE_TYPE_SUSPENDED
-from anki.utils import stripHTML
+from anki.hooks import addHook
+from anki.utils import intTime, splitFields, stripHTML
 from aqt import mw
 from aqt.utils import showInfo, tooltip
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
 from PyQt5.QtWidgets import (
     QAbstractItemView,
     QDialog,
     QDialogButtonBox,
     QHBoxLayout,
-    QListWidget,
-    QListWidgetItem,
+    QListView,
     QPushButton,
     QVBoxLayout,
 )
@@ -48,10 +50,119 @@ SCHEDULE_MUCHLATER = 4
 SCHEDULE_CUSTOM = 6
 SCHEDULE_NEVER = 8
 
+# new card positions at or above 1,000,000 are reset by Check Database
+POSITION_LIMIT = 500000
+POSITION_GAP = 1024
+
+
+class CardListModel(QAbstractListModel):
+    """Organizer rows, formatted only when the view asks for them."""
+
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.rows = []
+        self._posWidth = 1
+        self._titles = {}
+
+    def setCards(self, cardInfo):
+        # titles may have been edited since the last load
+        self._titles = {}
+        self._posWidth = len(str(len(cardInfo) + 1))
+        self.setRows(list(enumerate(cardInfo, start=1)))
+
+    def setRows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def cids(self):
+        return [card["id"] for _, card in self.rows]
+
+    def moveCards(self, rows, dest):
+        """Move the sorted rows as one block to start at dest."""
+        selected = set(rows)
+        block = [self.rows[row] for row in rows]
+        rest = [r for i, r in enumerate(self.rows) if i not in selected]
+        blockRows = {row: dest + i for i, row in enumerate(rows)}
+
+        def newRow(row):
+            if row in blockRows:
+                return blockRows[row]
+            row -= bisect_left(rows, row)
+            return row if row < dest else row + len(rows)
+
+        self._relayout(rest[:dest] + block + rest[dest:], newRow)
+
+    def shiftCards(self, rows, offset):
+        """Move each of the sorted rows one place up (-1) or down (1)."""
+        origin = {}
+        for row in rows if offset < 0 else reversed(rows):
+            dest = row + offset
+            origin[row], origin[dest] = origin.get(dest, dest), origin.get(row, row)
+
+        newRows = list(self.rows)
+        for row, old in origin.items():
+            newRows[row] = self.rows[old]
+        moved = {old: row for row, old in origin.items()}
+        self._relayout(newRows, lambda row: moved.get(row, row))
+
+    def _relayout(self, rows, newRow):
+        self.layoutAboutToBeChanged.emit()
+        self.rows = rows
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(newRow(index.row())) for index in persistent]
+        )
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        pos, card = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return self._format(pos, card)
+        if role == Qt.ToolTipRole:
+            return self._title(card)
+        if role == Qt.UserRole:
+            return card
+        return None
+
+    def _title(self, card):
+        if card["id"] not in self._titles:
+            self._titles[card["id"]] = sub(r"\s+", " ", stripHTML(card["title"]))
+        return self._titles[card["id"]]
+
+    def _format(self, pos, card):
+        if self.settings["prioEnabled"]:
+            info = card["priority"]
+        else:
+            info = str(pos).zfill(self._posWidth)
+
+        title = self._title(card)
+        try:
+            return self.settings["organizerFormat"].format(info=info, title=title)
+        except KeyError as keyerror:
+            tooltip(f"KeyError in CardListModel: {keyerror}")
+            return str(title)
+
 
 class Scheduler:
     did = None
-    cardListWidget = None
+    cardListView = None
+
+    def __init__(self):
+        self._cardInfoCache = {}
+        addHook("unloadProfile", self.clearCardInfoCache)
+        hooks.card_will_flush.append(self._onCardFlush)
+        hooks.note_will_flush.append(self._onNoteFlush)
+        hooks.notes_will_be_deleted.append(self._onNotesDeleted)
 
     def showDialog(self, currentCard=None):
         if currentCard:
@@ -67,14 +178,13 @@ class Scheduler:
 
         dialog = QDialog(mw)
         layout = QVBoxLayout()
-        self.cardListWidget = QListWidget()
-        self.cardListWidget.setAlternatingRowColors(True)
-        self.cardListWidget.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        self.cardListWidget.setWordWrap(True)
-        self.cardListWidget.itemDoubleClicked.connect(
-            lambda: showBrowser(
-                self.cardListWidget.currentItem().data(Qt.UserRole)["nid"]
-            )
+        self.cardListView = QListView()
+        self.cardListView.setAlternatingRowColors(True)
+        self.cardListView.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.cardListView.setUniformItemSizes(True)
+        self.cardListView.setModel(CardListModel(self.settings, self.cardListView))
+        self.cardListView.doubleClicked.connect(
+            lambda index: showBrowser(index.data(Qt.UserRole)["nid"])
         )
 
         self._updateListItems()
@@ -104,7 +214,7 @@ class Scheduler:
         buttonBox.setOrientation(Qt.Horizontal)
 
         layout.addLayout(controlsLayout)
-        layout.addWidget(self.cardListWidget)
+        layout.addWidget(self.cardListView)
         layout.addWidget(buttonBox)
 
         dialog.setLayout(layout)
@@ -113,15 +223,10 @@ class Scheduler:
         choice = dialog.exec_()
 
         if choice == 1:
-            cids = []
-            for i in range(self.cardListWidget.count()):
-                card = self.cardListWidget.item(i).data(Qt.UserRole)
-                cids.append(card["id"])
-
-            self.reorder(cids)
+            self.reorder(self.cardListView.model().cids())
 
     def _updateListItems(self):
-        # Checking if CardListWidget is None is a workaround for the following error:
+        # Checking if cardListView is None is a workaround for the following error:
         # Which unfortunately does not always work because the underlying C++ object
         # is the thing that gets deleted, not the python object.
         #         Traceback (most recent call last):
@@ -135,26 +240,9 @@ class Scheduler:
         #   File "/Users/cjon/Library/Application Support/Anki2/addons21/ir/schedule.py", line 127, in _updateListItems
         #     self.cardListWidget.clear()
         # RuntimeError: wrapped C/C++ object of type QListWidget has been deleted
-        if self.cardListWidget is None:
+        if self.cardListView is None:
             return
-        cardInfo = self._getCardInfo(self.did)
-        self.cardListWidget.clear()
-        posWidth = len(str(len(cardInfo) + 1))
-        for i, card in enumerate(cardInfo, start=1):
-            if self.settings["prioEnabled"]:
-                info = card["priority"]
-            else:
-                info = str(i).zfill(posWidth)
-            title = sub(r"\s+", " ", stripHTML(card["title"]))
-            try:
-                text = self.settings["organizerFormat"].format(info=info, title=title)
-            except KeyError as keyerror:
-                tooltip(f"KeyError in _updateListItems: {keyerror}")
-                text = str(title)
-
-            item = QListWidgetItem(text)
-            item.setData(Qt.UserRole, card)
-            self.cardListWidget.addItem(item)
+        self.cardListView.model().setCards(self._getCardInfo(self.did))
 
     def _moveToTop(self):
         selected = self._getSelected()
@@ -162,13 +250,8 @@ class Scheduler:
             showInfo("Please select one or several items.")
             return
 
-        selected.reverse()
-        for item in selected:
-            self.cardListWidget.takeItem(self.cardListWidget.row(item))
-            self.cardListWidget.insertItem(0, item)
-            item.setSelected(True)
-
-        self.cardListWidget.scrollToTop()
+        self.cardListView.model().moveCards(selected, 0)
+        self.cardListView.scrollToTop()
 
     def _moveUp(self):
         selected = self._getSelected()
@@ -176,15 +259,12 @@ class Scheduler:
             showInfo("Please select one or several items.")
             return
 
-        if self.cardListWidget.row(selected[0]) == 0:
+        if selected[0] == 0:
             return
 
-        for item in selected:
-            row = self.cardListWidget.row(item)
-            self.cardListWidget.takeItem(row)
-            self.cardListWidget.insertItem(row - 1, item)
-            item.setSelected(True)
-            self.cardListWidget.scrollToItem(item)
+        model = self.cardListView.model()
+        model.shiftCards(selected, -1)
+        self.cardListView.scrollTo(model.index(selected[0] - 1))
 
     def _moveDown(self):
         selected = self._getSelected()
@@ -192,17 +272,12 @@ class Scheduler:
             showInfo("Please select one or several items.")
             return
 
-        selected.reverse()
-
-        if self.cardListWidget.row(selected[0]) == self.cardListWidget.count() - 1:
+        model = self.cardListView.model()
+        if selected[-1] == model.rowCount() - 1:
             return
 
-        for item in selected:
-            row = self.cardListWidget.row(item)
-            self.cardListWidget.takeItem(row)
-            self.cardListWidget.insertItem(row + 1, item)
-            item.setSelected(True)
-            self.cardListWidget.scrollToItem(item)
+        model.shiftCards(selected, 1)
+        self.cardListView.scrollTo(model.index(selected[-1] + 1))
 
     def _moveToBottom(self):
         selected = self._getSelected()
@@ -210,39 +285,32 @@ class Scheduler:
             showInfo("Please select one or several items.")
             return
 
-        for item in selected:
-            self.cardListWidget.takeItem(self.cardListWidget.row(item))
-            self.cardListWidget.insertItem(self.cardListWidget.count(), item)
-            item.setSelected(True)
-
-        self.cardListWidget.scrollToBottom()
+        model = self.cardListView.model()
+        model.moveCards(selected, model.rowCount() - len(selected))
+        self.cardListView.scrollToBottom()
 
     def _getSelected(self):
-        return [
-            self.cardListWidget.item(i)
-            for i in range(self.cardListWidget.count())
-            if self.cardListWidget.item(i).isSelected()
-        ]
+        return sorted(
+            index.row() for index in self.cardListView.selectionModel().selectedRows()
+        )
 
     def _randomize(self):
-        allItems = [
-            self.cardListWidget.takeItem(0) for _ in range(self.cardListWidget.count())
-        ]
+        model = self.cardListView.model()
+        rows = list(model.rows)
         if self.settings["prioEnabled"]:
             maxPrio = len(self.settings["priorities"]) - 1
-            for item in allItems:
-                priority = item.data(Qt.UserRole)["priority"]
+
+            def contNewPos(row):
+                priority = row[1]["priority"]
                 if priority != "":
-                    item.contNewPos = gauss(maxPrio - int(priority), maxPrio / 20)
-                else:
-                    item.contNewPos = float("inf")
-            allItems.sort(key=lambda item: item.contNewPos)
+                    return gauss(maxPrio - int(priority), maxPrio / 20)
+                return float("inf")
 
+            rows.sort(key=contNewPos)
         else:
-            shuffle(allItems)
+            shuffle(rows)
 
-        for item in allItems:
-            self.cardListWidget.addItem(item)
+        model.setRows(rows)
 
     def answer(self, card, ease, old_func):
         if self.settings["prioEnabled"]:
@@ -301,15 +369,69 @@ class Scheduler:
             tooltip("Card moved to position {}".format(newPos))
 
     def reposition(self, card, newPos):
-        cids = [c["id"] for c in self._getCardInfo(card.did)]
-        mw.col.sched.forgetCards(cids)
-        cids.remove(card.id)
-        newOrder = cids[: newPos - 1] + [card.id] + cids[newPos - 1 :]
-        mw.col.sched.sortCards(newOrder)
+        # Positions are spread out with gaps between them, so moving a card
+        # only rewrites that card's due value. The whole deck is renumbered
+        # only when there is no free position left between its neighbours.
+        cardInfo = self._getCardInfo(card.did)
+        moved = next((c for c in cardInfo if c["id"] == card.id), None)
+        cardInfo = [c for c in cardInfo if c["id"] != card.id]
+        mw.col.sched.forgetCards([card.id])
+        newPos = min(max(1, newPos), len(cardInfo) + 1)
+        gap = self._positionGap(len(cardInfo) + 1)
+
+        before = cardInfo[newPos - 2]["due"] if newPos > 1 else 0
+        if newPos <= len(cardInfo):
+            after = cardInfo[newPos - 1]["due"]
+        else:
+            after = before + 2 * gap
+
+        due = (before + after) // 2
+        renumbered = not (before < due < after and due < POSITION_LIMIT)
+        if renumbered:
+            cids = [c["id"] for c in cardInfo]
+            cids.insert(newPos - 1, card.id)
+            self._renumber(cids)
+        else:
+            self._setDue(card.id, due)
+
+        if moved is None:
+            self._cardInfoCache.pop(card.did, None)
+            return
+
+        cardInfo.insert(newPos - 1, dict(moved, due=due))
+        if renumbered:
+            gap = self._positionGap(len(cardInfo))
+            cardInfo = [dict(c, due=gap * i) for i, c in enumerate(cardInfo, start=1)]
+        self._cardInfoCache[card.did] = (mw.col.mod, cardInfo)
 
     def reorder(self, cids):
         mw.col.sched.forgetCards(cids)
-        mw.col.sched.sortCards(cids)
+        self._renumber(cids)
+        self._cardInfoCache.pop(self.did, None)
+
+    def _positionGap(self, cardCount):
+        return max(1, min(POSITION_GAP, POSITION_LIMIT // (cardCount + 1)))
+
+    def _renumber(self, cids):
+        gap = self._positionGap(len(cids))
+        mw.col.sched.sortCards(cids, start=gap, step=gap)
+        self._reservePosition(gap * len(cids))
+
+    def _setDue(self, cid, due):
+        mw.col.db.execute(
+            "update cards set due = ?, mod = ?, usn = ? where id = ?",
+            due,
+            intTime(),
+            mw.col.usn(),
+            cid,
+        )
+        self._reservePosition(due)
+
+    def _reservePosition(self, due):
+        # keep newly added cards behind the ones already in the queue
+        if mw.col.conf["nextPos"] <= due:
+            mw.col.conf["nextPos"] = due + 1
+            mw.col.setMod()
 
     def get_button_interval(self, ease):
         # XXX Hardcoded values, maybe allow setting in gui?
@@ -338,26 +460,69 @@ class Scheduler:
         return f"<span class=nobold>{txt}</span><br>"
 
     def _getCardInfo(self, did):
+        cached = self._cardInfoCache.get(did)
+        if cached and cached[0] == mw.col.mod:
+            return cached[1]
+
+        cardInfo = self._loadCardInfo(did)
+        self._cardInfoCache[did] = (mw.col.mod, cardInfo)
+        return cardInfo
+
+    def clearCardInfoCache(self):
+        self._cardInfoCache.clear()
+
+    def _onCardFlush(self, card):
+        # answering a card flushes it too, but its new position is written
+        # back to the cache by reposition
+        cached = self._cardInfoCache.get(card.did)
+        if not cached:
+            return
+
+        if card.queue == QUEUE_TYPE_SUSPENDED or not any(
+            c["id"] == card.id for c in cached[1]
+        ):
+            self._cardInfoCache.pop(card.did)
+
+    def _onNoteFlush(self, note):
+        self.clearCardInfoCache()
+
+    def _onNotesDeleted(self, col, ids):
+        self.clearCardInfoCache()
+
+    def _loadCardInfo(self, did):
+        model = mw.col.models.byName(self.settings["modelName"])
+        if not model:
+            return []
+
+        fieldMap = mw.col.models.fieldMap(model)
+        titleIndex, _ = fieldMap[self.settings["titleField"]]
+        if self.settings["prioEnabled"]:
+            prioIndex, _ = fieldMap[self.settings["prioField"]]
+
         cardInfo = []
 
-        for cid, nid in mw.col.db.execute(
-            f"select id, nid from cards where did = ? and queue <> {QUEUE_TYPE_SUSPENDED}",
+        for cid, nid, due, flds in mw.col.db.execute(
+            f"""select c.id, c.nid, c.due, n.flds from cards c
+                join notes n on n.id = c.nid
+                where c.did = ? and c.queue <> {QUEUE_TYPE_SUSPENDED} and n.mid = ?
+                order by c.due""",
             did,
+            model["id"],
         ):
-            note = mw.col.getNote(nid)
-            if note.model()["name"] == self.settings["modelName"]:
-                if self.settings["prioEnabled"]:
-                    prio = note[self.settings["prioField"]]
-                else:
-                    prio = None
-
-                cardInfo.append(
-                    {
-                        "id": cid,
-                        "nid": nid,
-                        "title": note[self.settings["titleField"]],
-                        "priority": prio,
-                    }
-                )
+            fields = splitFields(flds)
+            if self.settings["prioEnabled"]:
+                prio = fields[prioIndex]
+            else:
+                prio = None
+
+            cardInfo.append(
+                {
+                    "id": cid,
+                    "nid": nid,
+                    "due": due,
+                    "title": fields[titleIndex],
+                    "priority": prio,
+                }
+            )
 
         return cardInfo
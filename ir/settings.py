@@ -33,8 +33,13 @@ class SettingsManager:
         "organizerFormat": ["info", "title"],
         "sourceFormat": ["url", "date"],
     }
-    doNotUpdate = ["feedLog", "modified", "quickKeys", "scroll", "zoom"]
+    doNotUpdate = ["feedLog", "modified", "quickKeys"]
+    # per-card maps, once kept in their own files and now in ir_cards.db; they
+    # are only loaded so that they can be migrated, see removeLegacy
+    legacyKeys = ["scroll", "zoom"]
+    saveDelay = 2000
     defaults = {
+        "articleOnly": False,
         "badTags": ["iframe", "script"],
         "boldSeq": "Ctrl+B",
         "copyTitle": False,
@@ -79,7 +84,6 @@ class SettingsManager:
         "quickKeys": {},
         "removeKey": "z",
         "scheduleExtract": True,
-        "scroll": {},
         "soonMethod": "percent",
         "soonRandom": True,
         "soonValue": 10,
@@ -95,11 +99,12 @@ class SettingsManager:
         "undoKey": "u",
         "userAgent": "IR/{} (+{})".format(__version__, IR_GITHUB_URL),
         "version": __version__,
-        "zoom": {},
         "zoomStep": 0.1,
     }
 
     def __init__(self):
+        self._dirty = False
+        self._saveTimer = None
         addHook("unloadProfile", self._unload)
         self.load()
 
@@ -112,6 +117,8 @@ class SettingsManager:
         except KeyError:
             self.settings[key] = SettingsManager.defaults[key]
 
+        self.markDirty()
+
     def __getitem__(self, key):
         return self.settings[key]
 
@@ -127,11 +134,45 @@ class SettingsManager:
     def _loadExisting(self):
         with open(self.getSettingsPath(), encoding="utf-8") as jsonFile:
             self.settings = json.load(jsonFile)
+
+        for key in self.legacyKeys:
+            path = self._getLegacyPath(key)
+            if os.path.isfile(path):
+                with open(path, encoding="utf-8") as jsonFile:
+                    self.settings[key] = json.load(jsonFile)
+
+        version = self.settings.get("version")
         self._update()
+        if self.updated or version != self.settings["version"]:
+            self.markDirty()
 
     def getSettingsPath(self):
         return os.path.join(self.getMediaDir(), "_ir.json")
 
+    def _getLegacyPath(self, key):
+        return os.path.join(self.getMediaDir(), "_ir_{}.json".format(key))
+
+    def getLegacy(self, key):
+        return self.settings.get(key, {})
+
+    def removeLegacy(self):
+        """Forget the legacy per-card maps once they have been migrated, and
+        delete their files."""
+        changed = False
+        for key in self.legacyKeys:
+            changed |= self.settings.pop(key, None) is not None
+            if key in self.settings["modified"]:
+                self.settings["modified"].remove(key)
+
+        # the settings are written first, so that if this is interrupted the
+        # maps are still found, and migrated again, on the next load
+        if changed:
+            self.save()
+        for key in self.legacyKeys:
+            path = self._getLegacyPath(key)
+            if os.path.isfile(path):
+                os.remove(path)
+
     def getMediaDir(self):
         return os.path.join(mw.pm.profileFolder(), "collection.media")
 
@@ -180,7 +221,7 @@ class SettingsManager:
 
     def _updateUnmodified(self):
         for k in self.settings:
-            if k in self.doNotUpdate:
+            if k in self.doNotUpdate or k in self.legacyKeys:
                 continue
 
             if k in self.settings["modified"]:
@@ -208,13 +249,41 @@ class SettingsManager:
             mw.form.menubar.removeAction(menu.menuAction())
 
         mw.customMenus.clear()
-        self.save()
 
-    def save(self):
-        with open(self.getSettingsPath(), "w", encoding="utf-8") as jsonFile:
-            json.dump(self.settings, jsonFile)
+        if self._saveTimer:
+            self._saveTimer.stop()
+        self.flush()
 
-        updateModificationTime(self.getMediaDir())
+    def markDirty(self):
+        """Schedule the settings file to be written. This must be called
+        after changing a nested value in place, such as a quick key."""
+        self._dirty = True
+
+        # changes are batched, so the file is written at most once per delay
+        if not self._saveTimer:
+            self._saveTimer = mw.progress.timer(self.saveDelay, self.flush, False)
+
+    def flush(self):
+        """Write the settings if they changed since the last write."""
+        self._saveTimer = None
+        if self._dirty:
+            self._dirty = False
+            self._write(self.getSettingsPath(), self.settings)
+            updateModificationTime(self.getMediaDir())
+
+    def save(self):
+        """Write all settings now."""
+        self._dirty = True
+        self.flush()
+
+    def _write(self, path, data):
+        # replacing the file in one step means a crash can't leave it
+        # truncated; the temporary file is kept out of collection.media so
+        # that media sync and Check Media never see it
+        tempPath = os.path.join(mw.pm.profileFolder(), os.path.basename(path) + ".tmp")
+        with open(tempPath, "w", encoding="utf-8") as jsonFile:
+            json.dump(data, jsonFile)
+        os.replace(tempPath, path)
 
     def loadMenuItems(self):
         path = "Read::Quick Keys"
@@ -28,10 +28,15 @@ from aqt.utils import getText, showInfo, showWarning, tooltip
 from .util import fixImages, getField, setField
 
 SCHEDULE_EXTRACT = 0
+# the page sends the whole text after this many changes, so that a change
+# applied to the wrong text cannot persist for long
+SNAPSHOT_INTERVAL = 20
 
 
 class TextManager:
     history = defaultdict(list)
+    # note ID and text of the last save, which changes from the page apply to
+    lastSaved = None
 
     def highlight(self, bgColor=None, textColor=None):
         if not bgColor:
@@ -175,20 +180,45 @@ class TextManager:
             showInfo("No undo history for this note.")
             return
 
-        note["Text"] = self.history[note.id].pop()
+        entry = self.history[note.id].pop()
+        if isinstance(entry, str):
+            note["Text"] = entry
+        else:
+            start, end, old = entry
+            note["Text"] = note["Text"][:start] + old + note["Text"][end:]
         note.flush()
         mw.reset()
         tooltip("Undone")
 
-    def save(self):
-        def callback(text):
-            if text:
-                note = mw.reviewer.card.note()
-                self.history[note.id].append(note["Text"])
-                note["Text"] = text
-                note.flush()
-
+    def save(self, snapshotInterval=SNAPSHOT_INTERVAL):
+        """Save the text as edited in the page. Usually only the changed
+        part is sent; see irText in text.js."""
         mw.web.evalWithCallback(
-            'document.getElementsByClassName("ir-text")[0].innerHTML;',
-            callback,
+            "irText.changes({});".format(snapshotInterval), self._applyChanges
         )
+
+    def _applyChanges(self, changes):
+        if not changes:
+            return
+
+        note = mw.reviewer.card.note()
+        text = note["Text"]
+
+        if "snapshot" in changes:
+            newText = changes["snapshot"]
+            self.history[note.id].append(text)
+        elif self.lastSaved != (note.id, text):
+            # the note was changed elsewhere, so the change cannot be applied
+            self.save(snapshotInterval=0)
+            return
+        else:
+            start = int(changes["start"])
+            end = len(text) - int(changes["suffix"])
+            newText = text[:start] + changes["text"] + text[end:]
+            self.history[note.id].append(
+                (start, start + len(changes["text"]), text[start:end])
+            )
+
+        note["Text"] = newText
+        note.flush()
+        self.lastSaved = (note.id, newText)
@@ -18,7 +18,6 @@ import time
 from urllib.parse import unquote
 
 from aqt import dialogs, mw
-from bs4 import BeautifulSoup
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWidgets import QAction, QMenu, QSpinBox
@@ -136,6 +135,9 @@ def updateModificationTime(path):
 def fixImages(html):
     if not html:
         return ""
+    # bs4 is slow to import and only needed once text is extracted
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     for img in soup.find_all("img"):
         img["src"] = os.path.basename(unquote(img["src"]))
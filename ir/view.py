@@ -15,89 +15,129 @@
 # OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
 # PERFORMANCE OF THIS SOFTWARE.
 
-from anki.hooks import addHook
+from anki.hooks import addHook, wrap
 from aqt import mw
+from aqt.reviewer import Reviewer
 
+from .cardstate import CardState, getCardStatePath
 from .util import isIrCard, loadFile, viewingIrText
 
+# the page reports its scroll position at most once per interval (in
+# milliseconds)
+SCROLL_REPORT_INTERVAL = 250
+
 
 class ViewManagerException(Exception):
     pass
 
 
 class ViewManager:
-    viewportHeight = None
-    pageBottom = None
+    cardState = None
+    # scroll events in the page, and the position reports they were batched
+    # into; without batching, each event would have been a round-trip
+    scrollEvents = 0
+    scrollReports = 0
+    # positions read by saveScroll before the text is edited or extracted
+    scrollQueries = 0
 
     def __init__(self):
-        self.scrollScript = loadFile("web", "scroll.js")
-        self.textScript = loadFile("web", "text.js")
         self.widthScript = loadFile("web", "width.js")
+        self.pageScript = "".join(
+            [
+                loadFile("web", "text.js"),
+                loadFile("web", "scroll.js").format(interval=SCROLL_REPORT_INTERVAL),
+                self.widthScript,
+            ]
+        )
+        self.pageMaxWidth = None
         self.zoomFactor = 1
         self.origBridgeCmd = None
+        Reviewer._initWeb = wrap(Reviewer._initWeb, self.installScripts)
+        addHook("beforeStateChange", self.flushScroll)
         addHook("afterStateChange", self.resetZoom)
         addHook("prepareQA", self.prepareCard)
-        mw.web.page().scrollPositionChanged.connect(self.saveScroll)
+        addHook("unloadProfile", self.pruneCardState)
 
     def prepareCard(self, html, card, context):
         if (isIrCard(card) and self.settings["limitWidth"]) or self.settings[
             "limitWidthAll"
         ]:
-            js = self.widthScript.format(maxWidth=self.settings["maxWidth"])
+            maxWidth = self.settings["maxWidth"]
         else:
-            js = ""
-
-        if isIrCard(card) and context.startswith("review"):
-            self.origBridgeCmd = mw.web.onBridgeCmd
-            mw.web.onBridgeCmd = self.storePageInfo
-            cid = str(card.id)
-
-            if cid not in self.settings["zoom"]:
-                self.settings["zoom"][cid] = 1
-
-            if cid not in self.settings["scroll"]:
-                self.settings["scroll"][cid] = 0
-
-            self.setZoom()
-            js += self.textScript
-            js += self.scrollScript.format(savedPos=self.settings["scroll"][cid])
+            maxWidth = None
+
+        if not context.startswith("review"):
+            # other webviews do not have the scripts installed
+            if maxWidth:
+                js = self.widthScript + "irSetMaxWidth({});".format(maxWidth)
+                html += "<script>" + js + "</script>"
+            return html
+
+        self.flushScroll()
+        calls = []
+        if maxWidth != self.pageMaxWidth:
+            calls.append("irSetMaxWidth({});".format(maxWidth or 0))
+            self.pageMaxWidth = maxWidth
+
+        if isIrCard(card):
+            if mw.web.onBridgeCmd != self.onBridgeCmd:
+                self.origBridgeCmd = mw.web.onBridgeCmd
+                mw.web.onBridgeCmd = self.onBridgeCmd
+            cardState = self._getCardState()
+            self.setZoom(cardState.getZoom(card.id))
+            calls.append(
+                "irScroll.setCard({}, {});".format(
+                    card.id, cardState.getScroll(card.id)
+                )
+            )
 
-        if js:
-            html += "<script>" + js + "</script>"
+        if calls:
+            html += "<script>onUpdateHook.push(function () {{ {} }});</script>".format(
+                " ".join(calls)
+            )
 
         return html
 
-    def storePageInfo(self, cmd):
-        try:
-            if cmd == "store":
-
-                def callback(pageInfo):
-                    self.viewportHeight, self.pageBottom = pageInfo
-
-                mw.web.evalWithCallback(
-                    "[window.innerHeight, document.body.scrollHeight];", callback
-                )
-            elif self.origBridgeCmd:
-                return self.origBridgeCmd(cmd)
-        except RecursionError:
-            print(f"RecursionError: `{self.origBridgeCmd}`")
-            pass
+    def installScripts(self, *args):
+        """Install the scripts in the review page, once per page load.
+        Cards then only need to call them."""
+        self.pageMaxWidth = None
+        mw.web.eval(self.pageScript)
+
+    def onBridgeCmd(self, cmd):
+        if cmd.startswith("irScroll:"):
+            self._savePosition(cmd.split(":")[1:])
+        elif self.origBridgeCmd:
+            return self.origBridgeCmd(cmd)
+
+    def _getCardState(self):
+        path = getCardStatePath()
+        if not self.cardState or self.cardState.path != path:
+            self.cardState = CardState(path)
+            scroll = self.settings.getLegacy("scroll")
+            zoom = self.settings.getLegacy("zoom")
+            if scroll or zoom:
+                self.cardState.migrate(scroll, zoom)
+            self.settings.removeLegacy()
+        return self.cardState
+
+    def pruneCardState(self):
+        if self.cardState:
+            self.cardState.prune(mw.col.db.list("select id from cards"))
 
     def setZoom(self, factor=None):
         if factor:
             mw.web.setZoomFactor(factor)
         else:
-            mw.web.setZoomFactor(self.settings["zoom"][str(mw.reviewer.card.id)])
+            cid = mw.reviewer.card.id
+            mw.web.setZoomFactor(self._getCardState().getZoom(cid))
 
     def zoomIn(self):
         if viewingIrText():
-            cid = str(mw.reviewer.card.id)
-
-            if cid not in self.settings["zoom"]:
-                self.settings["zoom"][cid] = 1
-
-            self.settings["zoom"][cid] += self.settings["zoomStep"]
-            mw.web.setZoomFactor(self.settings["zoom"][cid])
+            cid = mw.reviewer.card.id
+            cardState = self._getCardState()
+            cardState.setZoom(cid, cardState.getZoom(cid) + self.settings["zoomStep"])
+            mw.web.setZoomFactor(cardState.getZoom(cid))
         elif mw.state == "review":
             self.zoomFactor += self.settings["zoomStep"]
             mw.web.setZoomFactor(self.zoomFactor)
@@ -107,13 +147,10 @@ class ViewManager:
 
     def zoomOut(self):
         if viewingIrText():
-            cid = str(mw.reviewer.card.id)
-
-            if cid not in self.settings["zoom"]:
-                self.settings["zoom"][cid] = 1
-
-            self.settings["zoom"][cid] -= self.settings["zoomStep"]
-            mw.web.setZoomFactor(self.settings["zoom"][cid])
+            cid = mw.reviewer.card.id
+            cardState = self._getCardState()
+            cardState.setZoom(cid, cardState.getZoom(cid) - self.settings["zoomStep"])
+            mw.web.setZoomFactor(cardState.getZoom(cid))
         elif mw.state == "review":
             self.zoomFactor -= self.settings["zoomStep"]
             mw.web.setZoomFactor(self.zoomFactor)
@@ -121,37 +158,43 @@ class ViewManager:
             self.settings["generalZoom"] -= self.settings["zoomStep"]
             mw.web.setZoomFactor(self.settings["generalZoom"])
 
-    def saveScroll(self, event=None):
-        if viewingIrText():
+    def flushScroll(self, *args):
+        """Save a position the page has not reported yet. Called before the
+        page is replaced, when the report could no longer be sent."""
+        mw.web.evalWithCallback(
+            "window.irScroll ? irScroll.flush() : null;", self._savePosition
+        )
+
+    def _savePosition(self, position):
+        if position:
+            cid, pos, events = position
+            self.scrollEvents += int(events)
+            self.scrollReports += 1
+            self._getCardState().setScroll(int(cid), int(pos))
+
+    def saveScroll(self, cid=None):
+        if cid is None:
+            if not viewingIrText():
+                return
+            cid = mw.reviewer.card.id
 
-            def callback(currentPos):
-                self.settings["scroll"][str(mw.reviewer.card.id)] = currentPos
+        def callback(currentPos):
+            self._getCardState().setScroll(cid, currentPos)
 
-            mw.web.evalWithCallback("window.pageYOffset;", callback)
+        self.scrollQueries += 1
+        mw.web.evalWithCallback("window.pageYOffset;", callback)
 
     def pageUp(self):
-        currentPos = self.settings["scroll"][str(mw.reviewer.card.id)]
-        movementSize = self.viewportHeight * self.settings["pageScrollFactor"]
-        newPos = max(0, (currentPos - movementSize))
-        mw.web.eval("window.scrollTo(0, {});".format(newPos))
+        mw.web.eval("irScroll.by({});".format(-self.settings["pageScrollFactor"]))
 
     def pageDown(self):
-        currentPos = self.settings["scroll"][str(mw.reviewer.card.id)]
-        movementSize = self.viewportHeight * self.settings["pageScrollFactor"]
-        newPos = min(self.pageBottom, (currentPos + movementSize))
-        mw.web.eval("window.scrollTo(0, {});".format(newPos))
+        mw.web.eval("irScroll.by({});".format(self.settings["pageScrollFactor"]))
 
     def lineUp(self):
-        currentPos = self.settings["scroll"][str(mw.reviewer.card.id)]
-        movementSize = self.viewportHeight * self.settings["lineScrollFactor"]
-        newPos = max(0, (currentPos - movementSize))
-        mw.web.eval("window.scrollTo(0, {});".format(newPos))
+        mw.web.eval("irScroll.by({});".format(-self.settings["lineScrollFactor"]))
 
     def lineDown(self):
-        currentPos = self.settings["scroll"][str(mw.reviewer.card.id)]
-        movementSize = self.viewportHeight * self.settings["lineScrollFactor"]
-        newPos = min(self.pageBottom, (currentPos + movementSize))
-        mw.web.eval("window.scrollTo(0, {});".format(newPos))
+        mw.web.eval("irScroll.by({});".format(self.settings["lineScrollFactor"]))
 
     def resetZoom(self, state, *args):
         if not hasattr(self, "settings"):
@@ -14,13 +14,56 @@
  * CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
  */
 
-function storePageInfo() {{
-    pycmd("store")
-}}
+var irScroll = window.irScroll || (function () {{
+    var cardId = null;
+    var timer = null;
+    // scroll events since the last report, sent along so that Python can
+    // tell how many round-trips batching saved
+    var events = 0;
 
-function restoreScroll() {{
-    window.scrollTo(0, {savedPos});
-}}
+    function position() {{
+        var result = [cardId, Math.round(window.pageYOffset), events];
+        events = 0;
+        return result;
+    }}
 
-onUpdateHook.push(storePageInfo);
-onUpdateHook.push(restoreScroll);
+    function report() {{
+        timer = null;
+        if (cardId !== null) {{
+            pycmd("irScroll:" + position().join(":"));
+        }}
+    }}
+
+    function schedule() {{
+        events++;
+        if (!timer) {{
+            timer = setTimeout(report, {interval});
+        }}
+    }}
+
+    // the viewport height is read when paging, so it is never stale after
+    // a resize or zoom; the position may shift then, so it is reported
+    window.addEventListener("scroll", schedule, {{passive: true}});
+    window.addEventListener("resize", schedule);
+
+    return {{
+        setCard: function (cid, savedPos) {{
+            cardId = cid;
+            window.scrollTo(0, savedPos);
+        }},
+        by: function (factor) {{
+            window.scrollBy(0, window.innerHeight * factor);
+        }},
+        // called before the card is replaced: stop reporting, and return
+        // the position if it has changed since the last report
+        flush: function () {{
+            var pending = timer && cardId !== null ? position() : null;
+            clearTimeout(timer);
+            timer = null;
+            cardId = null;
+            events = 0;
+            return pending;
+        }},
+    }};
+}})();
+window.irScroll = irScroll;
@@ -93,3 +93,85 @@ function getHtmlText() {
     div.appendChild(range.cloneContents());
     return div.innerHTML;
 }
+
+
+// Tracks the article's HTML as last sent to Python, so that later changes
+// can be sent as a splice instead of the whole document.
+var irText = window.irText || (function () {
+    var element = null;
+    var saved = null;
+    var edits = 0;
+
+    function isHighSurrogate(code) {
+        return code >= 0xd800 && code <= 0xdbff;
+    }
+
+    function isLowSurrogate(code) {
+        return code >= 0xdc00 && code <= 0xdfff;
+    }
+
+    // Python indexes strings by code point, not UTF-16 unit
+    function codePoints(s, start, end) {
+        var n = end - start;
+        for (var i = start; i < end; i++) {
+            if (isLowSurrogate(s.charCodeAt(i))) {
+                n--;
+            }
+        }
+        return n;
+    }
+
+    function splice(a, b) {
+        var shortest = Math.min(a.length, b.length);
+        var prefix = 0;
+        while (prefix < shortest && a.charCodeAt(prefix) === b.charCodeAt(prefix)) {
+            prefix++;
+        }
+        if (prefix > 0 && isHighSurrogate(a.charCodeAt(prefix - 1))) {
+            prefix--;
+        }
+        var suffix = 0;
+        while (suffix < shortest - prefix &&
+               a.charCodeAt(a.length - 1 - suffix) ===
+               b.charCodeAt(b.length - 1 - suffix)) {
+            suffix++;
+        }
+        if (suffix > 0 && isLowSurrogate(a.charCodeAt(a.length - suffix))) {
+            suffix--;
+        }
+        return {
+            start: codePoints(a, 0, prefix),
+            suffix: codePoints(a, a.length - suffix, a.length),
+            text: b.slice(prefix, b.length - suffix),
+        };
+    }
+
+    return {
+        // Return the whole HTML as {snapshot}, or the change since the last
+        // call as {start, suffix, text}: the text between the first start
+        // and last suffix code points was replaced with text. A snapshot is
+        // sent for a newly rendered card and after every snapshotEvery
+        // changes.
+        changes: function (snapshotEvery) {
+            var current = document.getElementsByClassName("ir-text")[0];
+            if (!current) {
+                return null;
+            }
+            var html = current.innerHTML;
+            var result;
+            if (current !== element || edits >= snapshotEvery) {
+                result = {snapshot: html};
+                edits = 0;
+            } else if (html === saved) {
+                return null;
+            } else {
+                result = splice(saved, html);
+                edits++;
+            }
+            element = current;
+            saved = html;
+            return result;
+        },
+    };
+})();
+window.irText = irText;
@@ -14,9 +14,16 @@
  * CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
  */
 
-if (screen.width > {maxWidth}) {{
-    var styleSheet = document.styleSheets[0];
-    styleSheet.insertRule(
-        "div {{ width: {maxWidth}px; margin: 20px auto }}", 0
-    );
-}}
+function irSetMaxWidth(maxWidth) {
+    var style = document.getElementById("ir-width");
+    if (!style) {
+        style = document.createElement("style");
+        style.id = "ir-width";
+        document.head.appendChild(style);
+    }
+    if (maxWidth && screen.width > maxWidth) {
+        style.textContent = "div { width: " + maxWidth + "px; margin: 20px auto }";
+    } else {
+        style.textContent = "";
+    }
+}
@@ -0,0 +1,258 @@
+"""A minimal SQLite-backed stand-in for an Anki collection.
+
+Only the parts of the collection API used by the add-on are implemented, which
+is enough to run scheduling and import code headlessly against decks of any
+size:
+
+    col = Collection()
+    model = col.models.addModel("IR3", ["Title", "Text", "Source", "Priority"])
+    did = col.addDeck("Reading", model, 100000)
+    mw.col = col
+"""
+
+import sqlite3
+from itertools import count
+
+QUEUE_TYPE_SUSPENDED = -1
+QUEUE_TYPE_NEW = 0
+CARD_TYPE_NEW = 0
+FIELD_SEPARATOR = "\x1f"
+
+SCHEMA = """
+create table notes (
+    id integer primary key,
+    mid integer not null,
+    mod integer not null,
+    usn integer not null,
+    tags text not null,
+    flds text not null
+);
+create table cards (
+    id integer primary key,
+    nid integer not null,
+    did integer not null,
+    ord integer not null,
+    mod integer not null,
+    usn integer not null,
+    type integer not null,
+    queue integer not null,
+    due integer not null,
+    ivl integer not null
+);
+create index ix_cards_nid on cards (nid);
+create index ix_cards_sched on cards (did, queue, due);
+"""
+
+
+class Database:
+    def __init__(self):
+        self._db = sqlite3.connect(":memory:")
+        self._db.executescript(SCHEMA)
+
+    def execute(self, sql, *args):
+        return self._db.execute(sql, args).fetchall()
+
+    def executemany(self, sql, rows):
+        self._db.executemany(sql, rows)
+
+    def scalar(self, sql, *args):
+        row = self._db.execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    def list(self, sql, *args):
+        return [row[0] for row in self._db.execute(sql, args)]
+
+
+class Models:
+    def __init__(self):
+        self.models = {}
+        self._ids = count(1)
+
+    def addModel(self, name, fieldNames):
+        model = {
+            "id": next(self._ids),
+            "name": name,
+            "did": 1,
+            "flds": [{"name": n, "ord": i} for i, n in enumerate(fieldNames)],
+        }
+        self.models[model["id"]] = model
+        return model
+
+    def all(self):
+        return list(self.models.values())
+
+    def get(self, mid):
+        return self.models.get(mid)
+
+    def byName(self, name):
+        return next((m for m in self.models.values() if m["name"] == name), None)
+
+    def fieldMap(self, model):
+        return {f["name"]: (f["ord"], f) for f in model["flds"]}
+
+    def fieldNames(self, model):
+        return [f["name"] for f in model["flds"]]
+
+
+class Decks:
+    def __init__(self):
+        self.decks = {1: {"id": 1, "name": "Default"}}
+        self._ids = count(2)
+
+    def id(self, name):
+        deck = self.byName(name)
+        if not deck:
+            deck = {"id": next(self._ids), "name": name}
+            self.decks[deck["id"]] = deck
+        return deck["id"]
+
+    def all(self):
+        return list(self.decks.values())
+
+    def get(self, did):
+        return self.decks.get(did)
+
+    def byName(self, name):
+        return next((d for d in self.decks.values() if d["name"] == name), None)
+
+
+class Scheduler:
+    def __init__(self, col):
+        self.col = col
+
+    def forgetCards(self, cids):
+        self.col.db.executemany(
+            "update cards set type = ?, queue = ?, ivl = 0 where id = ?",
+            [(CARD_TYPE_NEW, QUEUE_TYPE_NEW, cid) for cid in cids],
+        )
+        start = self.col.db.scalar(
+            "select max(due) from cards where type = ?", CARD_TYPE_NEW
+        )
+        self.sortCards(cids, start=(start or 0) + 1)
+
+    def sortCards(self, cids, start=1, step=1):
+        due = start
+        rows = []
+        for cid in cids:
+            rows.append((due, self.col.mod, self.col.usn(), cid))
+            due += step
+        self.col.db.executemany(
+            "update cards set due = ?, mod = ?, usn = ? where id = ?", rows
+        )
+        self.col.conf["nextPos"] = max(self.col.conf["nextPos"], due)
+        self.col.setMod()
+
+
+class Note:
+    def __init__(self, col, model=None, id=None):
+        self.col = col
+        if id:
+            self.id = id
+            mid, tags, flds = col.db.execute(
+                "select mid, tags, flds from notes where id = ?", id
+            )[0]
+            self.mid = mid
+            self.tags = tags.split()
+            self.fields = flds.split(FIELD_SEPARATOR)
+        else:
+            self.id = None
+            self.mid = model["id"]
+            self.tags = []
+            self.fields = [""] * len(model["flds"])
+
+    def model(self):
+        return self.col.models.get(self.mid)
+
+    def cards(self):
+        return self.col.db.list(
+            "select id from cards where nid = ? order by ord", self.id
+        )
+
+    def flush(self):
+        self.col.db.execute(
+            "update notes set mod = ?, usn = ?, tags = ?, flds = ? where id = ?",
+            self.col.mod,
+            self.col.usn(),
+            " ".join(self.tags),
+            FIELD_SEPARATOR.join(self.fields),
+            self.id,
+        )
+        self.col.setMod()
+
+
+class Collection:
+    def __init__(self):
+        self.db = Database()
+        self.models = Models()
+        self.decks = Decks()
+        self.sched = Scheduler(self)
+        self.conf = {"nextPos": 1, "curDeck": 1, "estTimes": True}
+        self.mod = 0
+        self._ids = count(1)
+
+    def usn(self):
+        return -1
+
+    def setMod(self):
+        self.mod += 1
+
+    def getNote(self, nid):
+        return Note(self, id=nid)
+
+    def addNote(self, note):
+        note.id = next(self._ids)
+        self.db.execute(
+            "insert into notes values (?, ?, ?, ?, ?, ?)",
+            note.id,
+            note.mid,
+            self.mod,
+            self.usn(),
+            " ".join(note.tags),
+            FIELD_SEPARATOR.join(note.fields),
+        )
+        self._addCard(note.id, note.model()["did"])
+        self.setMod()
+        return 1
+
+    def _addCard(self, nid, did):
+        due = self.conf["nextPos"]
+        self.conf["nextPos"] += 1
+        self.db.execute(
+            "insert into cards values (?, ?, ?, 0, ?, ?, ?, ?, ?, 0)",
+            next(self._ids),
+            nid,
+            did,
+            self.mod,
+            self.usn(),
+            CARD_TYPE_NEW,
+            QUEUE_TYPE_NEW,
+            due,
+        )
+
+    def addDeck(self, name, model, size, step=1):
+        """Create a deck of new IR cards, one per note, spaced step apart.
+        Returns the deck id."""
+        did = self.decks.id(name)
+        fieldMap = self.models.fieldMap(model)
+        notes = []
+        cards = []
+        for i in range(size):
+            fields = [""] * len(model["flds"])
+            fields[fieldMap["Title"][0]] = "Article {}".format(i)
+            fields[fieldMap["Text"][0]] = "<p>Text of article {}</p>".format(i)
+            flds = FIELD_SEPARATOR.join(fields)
+            nid = next(self._ids)
+            notes.append((nid, model["id"], self.mod, self.usn(), "", flds))
+            cid = next(self._ids)
+            due = self.conf["nextPos"] + i * step
+            cards.append(
+                (cid, nid, did, 0, self.mod, self.usn())
+                + (CARD_TYPE_NEW, QUEUE_TYPE_NEW, due, 0)
+            )
+        self.db.executemany("insert into notes values (?, ?, ?, ?, ?, ?)", notes)
+        self.db.executemany(
+            "insert into cards values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", cards
+        )
+        self.conf["nextPos"] += size * step
+        self.setMod()
+        return did
@@ -0,0 +1,225 @@
+"""Performance benchmarks.
+
+Each benchmark keeps the best of several timings and fails if it is more than
+TOLERANCE times slower than the time stored in benchmarks.json. After an
+intentional change, record new times with `make baseline`.
+"""
+
+import gc
+import json
+import os
+import re
+import sys
+from importlib import import_module
+from time import perf_counter
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from .collection import QUEUE_TYPE_SUSPENDED, Collection
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmarks.json")
+UPDATE_BASELINE = bool(os.environ.get("IR_BENCHMARK_BASELINE"))
+TOLERANCE = 3
+# timings this short are mostly noise
+NOISE_FLOOR = 0.0002
+REPEAT = 5
+DECK_SIZES = [1000, 10000, 100000]
+
+SETTINGS = {
+    "feedLog": {},
+    "modelName": "IR3",
+    "prioEnabled": False,
+    "prioField": "Priority",
+    "titleField": "Title",
+}
+
+
+def measure(func, setup=None, number=1, repeat=REPEAT):
+    """Return the best time per call, running setup before each timing.
+    Garbage collection is disabled while timing, as in timeit."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = perf_counter()
+            for _ in range(number):
+                func()
+            times.append((perf_counter() - start) / number)
+        finally:
+            gc.enable()
+    return min(times)
+
+
+def makeFeed(entries):
+    items = "".join(
+        "<item><title>Entry {0}</title><link>http://example.com/{0}</link>"
+        "<description>&lt;p&gt;{1}&lt;/p&gt;</description>"
+        "<pubDate>Mon, 06 Sep 2010 00:{2:02d}:00 +0000</pubDate></item>".format(
+            i, "text " * 100, i % 60
+        )
+        for i in range(entries)
+    )
+    return '<?xml version="1.0"?><rss version="2.0"><channel>{}</channel></rss>'.format(
+        items
+    ).encode()
+
+
+class Shortcut:
+    def __init__(self, key):
+        self._key = key
+
+    def key(self):
+        return self
+
+    def toString(self):
+        return self._key
+
+
+class BenchmarkTests(TestCase):
+    results = {}
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            with open(BASELINE_PATH, encoding="utf-8") as f:
+                cls.baseline = json.load(f)
+        except FileNotFoundError:
+            cls.baseline = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BASELINE:
+            results = {k: round(v, 6) for k, v in cls.results.items()}
+            with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+                json.dump(dict(cls.baseline, **results), f, indent=2, sort_keys=True)
+                f.write("\n")
+
+    def setUp(self):
+        utils = MagicMock(
+            intTime=lambda: 0,
+            splitFields=lambda flds: flds.split("\x1f"),
+            stripHTML=lambda html: re.sub("<.*?>", "", html),
+        )
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(),
+            "PyQt5.QtGui": MagicMock(),
+            "PyQt5.QtWidgets": MagicMock(),
+            "anki": MagicMock(),
+            "anki.consts": MagicMock(QUEUE_TYPE_SUSPENDED=QUEUE_TYPE_SUSPENDED),
+            "anki.hooks": MagicMock(),
+            "anki.lang": MagicMock(),
+            "anki.notes": MagicMock(),
+            "anki.utils": utils,
+            "aqt": MagicMock(),
+            "aqt.addcards": MagicMock(),
+            "aqt.browser": MagicMock(),
+            "aqt.editcurrent": MagicMock(),
+            "aqt.reviewer": MagicMock(),
+            "aqt.tagedit": MagicMock(),
+            "aqt.utils": MagicMock(),
+            "sip": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        self._unloadAddon()
+        self.mw = sys.modules["aqt"].mw
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def _unloadAddon(self):
+        for name in list(sys.modules):
+            if name == "ir" or name.startswith("ir."):
+                del sys.modules[name]
+
+    def assertFast(self, name, seconds):
+        self.results[name] = seconds
+        baseline = self.baseline.get(name)
+        if baseline and not UPDATE_BASELINE:
+            self.assertLessEqual(
+                seconds,
+                max(baseline * TOLERANCE, NOISE_FLOOR),
+                "{} took {:.6f}s, baseline is {:.6f}s".format(name, seconds, baseline),
+            )
+
+    def _scheduler(self, cardCount):
+        """Return a scheduler and a card from a deck of cardCount cards."""
+        from ir.schedule import Scheduler
+
+        scheduler = Scheduler()
+        scheduler.settings = SETTINGS
+        col = Collection()
+        model = col.models.addModel("IR3", ["Title", "Text", "Source", "Priority"])
+        did = col.addDeck(
+            "Reading", model, cardCount, step=scheduler._positionGap(cardCount)
+        )
+        cid = col.db.scalar("select id from cards where did = ? order by due", did)
+        self.mw.col = col
+        return scheduler, MagicMock(id=cid, did=did)
+
+    def test_import(self):
+        self.assertFast(
+            "import", measure(lambda: import_module("ir"), setup=self._unloadAddon)
+        )
+
+    def test_getCardInfo(self):
+        for cardCount in DECK_SIZES:
+            scheduler, card = self._scheduler(cardCount)
+            self.assertFast(
+                "getCardInfo_{}".format(cardCount),
+                measure(
+                    lambda: scheduler._getCardInfo(card.did),
+                    setup=scheduler.clearCardInfoCache,
+                ),
+            )
+
+    def test_reposition(self):
+        for cardCount in DECK_SIZES:
+            scheduler, card = self._scheduler(cardCount)
+            self.assertFast(
+                "reposition_{}".format(cardCount),
+                measure(
+                    lambda: scheduler.reposition(card, cardCount // 2),
+                    setup=scheduler.clearCardInfoCache,
+                ),
+            )
+
+    def test_onPrepareQA(self):
+        manager = import_module("ir").mw.readingManager
+        manager.settings = SETTINGS
+        self.mw.stateShortcuts = [Shortcut(str(i)) for i in range(1, 5)] + [
+            Shortcut(chr(c)) for c in range(ord("a"), ord("z") + 1)
+        ]
+        irCard = MagicMock()
+        irCard.model.return_value = {"name": "IR3"}
+        otherCard = MagicMock()
+        otherCard.model.return_value = {"name": "Basic"}
+
+        def prepare():
+            manager.onPrepareQA("", irCard, "reviewAnswer")
+            manager.onPrepareQA("", otherCard, "reviewQuestion")
+
+        self.assertFast("onPrepareQA", measure(prepare, number=100))
+
+    def test_fixImages(self):
+        from ir.util import fixImages
+
+        html = "".join(
+            '<p>{0}<img src="http://example.com/images/{1}%20{1}.png"></p>'.format(
+                "text " * 50, i
+            )
+            for i in range(2000)
+        )
+        self.assertFast("fixImages", measure(lambda: fixImages(html)))
+
+    def test_parseFeed(self):
+        from ir.feeds import parseEntries
+        from ir.lib.feedparser import parse
+
+        feed = makeFeed(1000)
+        self.assertFast("parseEntries", measure(lambda: parseEntries(feed)))
+        self.assertFast("feedparser", measure(lambda: parse(feed), repeat=3))
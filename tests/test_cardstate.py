@@ -0,0 +1,50 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+
+class CardStateTests(TestCase):
+    def setUp(self):
+        modules = {"aqt": MagicMock(), "ir.main": MagicMock()}
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir.cardstate import CardState
+
+        self.state = CardState(":memory:")
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_migrate(self):
+        self.state.migrate({"1": 50, "2": 0}, {"1": 1.2, "2": 1})
+        self.assertEqual(self.state.getScroll(1), 50)
+        self.assertEqual(self.state.getZoom(1), 1.2)
+        self.assertEqual(self.state.getScroll(2), 0)
+        self.assertEqual(
+            self.state._db.execute("select id from cards").fetchall(), [(1,)]
+        )
+
+    def test_migrateTwice(self):
+        scroll, zoom = {"1": 50, "2": 30}, {"1": 1.2}
+        self.state.migrate(scroll, zoom)
+        self.state.setScroll(1, 80)
+        # the legacy maps are found again if their removal was interrupted
+        self.state.migrate(scroll, zoom)
+        self.assertEqual(self.state.getScroll(1), 80)
+        self.assertEqual(self.state.getZoom(1), 1.2)
+        self.assertEqual(self.state.getScroll(2), 30)
+
+    def test_defaults(self):
+        self.state.setScroll(1, 100.7)
+        self.state.setZoom(1, 1.1)
+        self.assertEqual(self.state.getScroll(1), 100)
+        self.state.setScroll(1, 0)
+        self.state.setZoom(1, 1.0000001)
+        self.assertEqual(self.state.getZoom(1), 1)
+        self.assertEqual(self.state._db.execute("select id from cards").fetchall(), [])
+
+    def test_prune(self):
+        self.state.setScroll(1, 10)
+        self.state.setScroll(2, 20)
+        self.state.prune([2, 3])
+        self.assertEqual(self.state.getScroll(1), 0)
+        self.assertEqual(self.state.getScroll(2), 20)
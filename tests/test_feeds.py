@@ -0,0 +1,190 @@
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+
+class FeedLogTests(TestCase):
+    def setUp(self):
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(),
+            "aqt": MagicMock(),
+            "ir.main": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir.feeds import MAX_BACKOFF, FeedLog
+
+        self.maxBackoff = MAX_BACKOFF
+
+        self.log = FeedLog(":memory:")
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_migrate(self):
+        self.log.migrate(
+            {"foo": {"downloaded": ["a", "b"], "etag": "x", "modified": "y"}}
+        )
+        self.assertEqual(self.log.getDownloaded("foo"), {"a", "b"})
+        self.assertEqual(self.log.getValidators("foo"), ("x", "y"))
+        self.assertEqual(self.log.getValidators("bar"), (None, None))
+
+    def test_prune(self):
+        self.log.addEntries("foo", ["a", "b"], downloaded=1)
+        self.log.addEntries("foo", ["c"])
+        self.log.prune("foo", ["b"])
+        self.assertEqual(self.log.getDownloaded("foo"), {"b", "c"})
+
+    def test_stage(self):
+        self.log.addEntries("foo", ["a"])
+        self.log.stage(
+            "foo", [{"link": "a", "title": "A"}, {"link": "b", "title": "B"}]
+        )
+        self.log.stage(
+            "foo", [{"link": "b", "title": "B"}, {"link": "c", "title": "C"}]
+        )
+        self.assertEqual(
+            self.log.getStaged("foo"),
+            [{"link": "b", "title": "B"}, {"link": "c", "title": "C"}],
+        )
+        self.log.unstage("foo", ["b"])
+        self.assertEqual([e["link"] for e in self.log.getStaged("foo")], ["c"])
+
+    def test_backoff(self):
+        self.log.update("foo", "x", "y")
+        self.log.subscribe("foo")
+        self.assertEqual(self.log.getValidators("foo"), (None, None))
+        self.assertEqual(self.log.getSubscriptions(), ["foo"])
+        self.assertEqual(self.log.getDueFeeds(), [])
+
+        with patch("ir.feeds.uniform", return_value=1):
+            for _ in range(10):
+                self.log.scheduleNext("foo", failed=True)
+        nextPoll = self.log._db.execute("select nextPoll from feeds").fetchone()[0]
+        self.assertAlmostEqual(nextPoll - time.time(), self.maxBackoff, delta=5)
+
+        self.log.unsubscribe("foo")
+        self.assertFalse(self.log.isSubscribed("foo"))
+
+    def test_poll(self):
+        from ir.feeds import FeedPoller
+
+        feed = {
+            "status": 200,
+            "etag": "x",
+            "modified": "y",
+            "entries": [{"link": "a"}, {"link": "b", "title": "B"}],
+        }
+        parseFeed = MagicMock(side_effect=lambda *args: dict(feed))
+        poller = FeedPoller(self.log, parseFeed)
+
+        self.assertEqual(len(poller.poll("foo")["entries"]), 2)
+        self.assertEqual(self.log.getStaged("foo"), [])
+        self.assertEqual(self.log.getValidators("foo"), (None, None))
+
+        self.log.subscribe("foo")
+        poller.poll("foo")
+        parseFeed.assert_called_with("foo", None, None)
+        self.assertEqual(
+            self.log.getStaged("foo"),
+            [{"link": "a", "title": "a"}, {"link": "b", "title": "B"}],
+        )
+        poller.poll("foo")
+        parseFeed.assert_called_with("foo", "x", "y")
+
+        self.log.unsubscribe("foo")
+        self.assertEqual(self.log.getStaged("foo"), [])
+        self.assertEqual(self.log.getValidators("foo"), (None, None))
+
+    def test_pollSoon(self):
+        from threading import Event
+
+        from ir.feeds import FeedPoller
+
+        release = Event()
+
+        def parseFeed(*args):
+            release.wait(5)
+            return {"status": 200, "entries": [{"link": "a"}]}
+
+        self.log.subscribe("foo")
+        poller = FeedPoller(self.log, MagicMock(side_effect=parseFeed))
+        poller.pollSoon("foo")
+        poller.pollSoon("foo")
+        release.set()
+        poller._executor.shutdown(wait=True)
+        poller.parseFeed.assert_called_once()
+        self.assertEqual(self.log.getStaged("foo"), [{"link": "a", "title": "a"}])
+        self.assertEqual(poller._polling, set())
+
+    def test_refresh(self):
+        from concurrent.futures import Future
+
+        from ir import feeds
+
+        def runInBackground(task, onDone):
+            future = Future()
+            future.set_result(task())
+            onDone(future)
+
+        mw = feeds.mw
+        mw.taskman.run_in_background.side_effect = runInBackground
+        mw.taskman.run_on_main.side_effect = lambda func: func()
+        parseFeed = MagicMock(
+            side_effect=lambda url, *args: {
+                "status": 200 if url == "a" else 404,
+                "entries": [],
+            }
+        )
+        onDone = MagicMock()
+        feeds.FeedPoller(self.log, parseFeed).refresh(["a", "b"], onDone)
+        onDone.assert_called_once_with(["b"])
+        self.assertEqual(mw.progress.update.call_count, 2)
+        mw.progress.finish.assert_called_once()
+
+
+class ParseEntriesTests(TestCase):
+    def setUp(self):
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(),
+            "aqt": MagicMock(),
+            "ir.main": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir.feeds import parseEntries
+
+        self.parseEntries = parseEntries
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_atom(self):
+        feed = self.parseEntries(
+            b'<feed xmlns="http://www.w3.org/2005/Atom">'
+            b'<entry><title>A</title><link rel="edit" href="/e"/>'
+            b'<link href="/a"/></entry>'
+            b"<entry><title>B</title></entry>"
+            b"</feed>",
+            "http://example.com/feed",
+        )
+        self.assertEqual(
+            feed["entries"], [{"link": "http://example.com/a", "title": "A"}]
+        )
+
+    def test_rss(self):
+        feed = self.parseEntries(
+            b"<rss><channel><item><link>http://example.com/a</link></item>"
+            b'<item><title>B</title><guid isPermaLink="false">b</guid></item>'
+            b"</channel></rss>"
+        )
+        self.assertEqual(
+            feed["entries"],
+            [{"link": "http://example.com/a", "title": "http://example.com/a"}],
+        )
+
+    def test_malformed(self):
+        self.assertIsNone(self.parseEntries(b"<rss><channel><item>"))
+        self.assertIsNone(self.parseEntries(b"<html><body></body></html>"))
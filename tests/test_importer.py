@@ -0,0 +1,112 @@
+from threading import Lock
+from time import sleep
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from bs4 import BeautifulSoup
+from requests.exceptions import TooManyRedirects
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(),
+            "PyQt5.QtGui": MagicMock(),
+            "PyQt5.QtWidgets": MagicMock(),
+            "anki": MagicMock(),
+            "anki.hooks": MagicMock(),
+            "anki.notes": MagicMock(),
+            "anki.utils": MagicMock(),
+            "aqt": MagicMock(),
+            "aqt.utils": MagicMock(),
+            "ir.main": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir import importer
+
+        self.importer = importer
+        self.imp = importer.Importer()
+        self.imp.settings = {"articleOnly": False}
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_requestError(self):
+        def fetch(url):
+            if url == "b":
+                raise TooManyRedirects
+            return url, []
+
+        self.imp._fetchArticle = fetch
+        self.imp._prepareArticle = lambda url, *args: (url, "", "", None)
+        self.imp._createNotes = MagicMock(return_value="Deck")
+        self.assertEqual(
+            self.imp._importArticles(["a", "b", "c"], None, ""), ("Deck", ["a", "c"])
+        )
+
+    def test_readError(self):
+        def fetch(url):
+            if url == "b":
+                raise LookupError("unknown encoding")
+            return url, []
+
+        self.imp._fetchArticle = fetch
+        self.imp._prepareArticle = lambda url, *args: (url, "", "", None)
+        self.imp._createNotes = MagicMock(return_value="Deck")
+        with patch.object(self.importer, "showWarning") as showWarning:
+            self.assertEqual(
+                self.imp._importArticles(["a", "b", "c"], None, ""),
+                ("Deck", ["a", "c"]),
+            )
+        showWarning.assert_called_once()
+
+    def test_archiveError(self):
+        def archive(article):
+            if article["given_url"] == "b":
+                raise TooManyRedirects
+
+        articles = [{"given_url": u} for u in ["a", "b", "c"]]
+        self.imp.settings.update({"prioEnabled": False, "pocketArchive": True})
+        self.imp.pocket = MagicMock(getArticles=lambda: articles, archive=archive)
+        self.imp._select = lambda choices: choices
+        self.imp._importArticles = MagicMock(return_value=("Deck", ["a", "b", "c"]))
+        with patch.object(self.importer, "showWarning") as showWarning:
+            self.imp.importPocket()
+        self.assertTrue(showWarning.call_args[0][0].endswith("\n\nb"))
+
+    def test_imageLimits(self):
+        lock = Lock()
+        active = {"total": 0, "max": 0, "host": 0, "maxHost": 0}
+
+        def download(address, articleUrl):
+            with lock:
+                active["total"] += 1
+                active["max"] = max(active["max"], active["total"])
+                if "one.example" in address:
+                    active["host"] += 1
+                    active["maxHost"] = max(active["maxHost"], active["host"])
+            sleep(0.01)
+            with lock:
+                active["total"] -= 1
+                if "one.example" in address:
+                    active["host"] -= 1
+            return None
+
+        self.imp._downloadImage = download
+        pages = [
+            BeautifulSoup(
+                "".join(
+                    '<img src="http://{}.example/{}-{}.png">'.format(host, page, i)
+                    for host in ["one", "two", "three"]
+                    for i in range(6)
+                ),
+                "html.parser",
+            )
+            for page in range(self.importer.PAGE_WORKERS)
+        ]
+        with self.importer.ThreadPoolExecutor(self.importer.PAGE_WORKERS) as pool:
+            list(pool.map(lambda page: self.imp._fetchImages(page, "http://a"), pages))
+        self.assertLessEqual(active["max"], self.importer.IMAGE_WORKERS)
+        self.assertLessEqual(active["maxHost"], self.importer.IMAGES_PER_HOST)
@@ -0,0 +1,69 @@
+import sys
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+
+class LazyImportTests(TestCase):
+    def setUp(self):
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(),
+            "PyQt5.QtGui": MagicMock(),
+            "PyQt5.QtWidgets": MagicMock(),
+            "anki": MagicMock(),
+            "anki.consts": MagicMock(),
+            "anki.hooks": MagicMock(),
+            "anki.lang": MagicMock(),
+            "anki.notes": MagicMock(),
+            "anki.utils": MagicMock(),
+            "aqt": MagicMock(),
+            "aqt.addcards": MagicMock(),
+            "aqt.browser": MagicMock(),
+            "aqt.editcurrent": MagicMock(),
+            "aqt.reviewer": MagicMock(),
+            "aqt.tagedit": MagicMock(),
+            "aqt.utils": MagicMock(),
+            "sip": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        for name in list(sys.modules):
+            if name == "ir" or name.startswith("ir."):
+                del sys.modules[name]
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_startup(self):
+        import ir  # noqa: F401
+
+        self.assertIn("ir.main", sys.modules)
+        self.assertNotIn("ir.importer", sys.modules)
+        self.assertNotIn("ir.lib.feedparser", sys.modules)
+        self.assertNotIn("ir.pocket", sys.modules)
+
+    def test_importer(self):
+        from ir.main import ReadingManager
+
+        manager = ReadingManager()
+        manager.settings = {"feedLog": {}}
+        self.assertIs(manager.importer, manager.importer)
+        self.assertIn("ir.importer", sys.modules)
+
+    def test_hasSubscriptions(self):
+        import os
+        from tempfile import TemporaryDirectory
+
+        from ir.feeds import FeedLog
+        from ir.main import ReadingManager
+
+        manager = ReadingManager()
+        with TemporaryDirectory() as folder:
+            path = os.path.join(folder, "ir_feeds.db")
+            with patch("ir.main.getFeedLogPath", return_value=path):
+                self.assertFalse(manager._hasSubscriptions())
+                self.assertFalse(os.path.exists(path))
+                feedLog = FeedLog(path)
+                feedLog.subscribe("foo")
+                feedLog.close()
+                self.assertTrue(manager._hasSubscriptions())
@@ -0,0 +1,46 @@
+import os
+import time
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+
+class MediaIndexTests(TestCase):
+    def setUp(self):
+        modules = {"aqt": MagicMock(), "ir.main": MagicMock()}
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir.media import REVALIDATE_AFTER, MediaIndex
+
+        self.revalidateAfter = REVALIDATE_AFTER
+        self.mediaDir = TemporaryDirectory()
+        self.index = MediaIndex(":memory:", self.mediaDir.name)
+
+    def tearDown(self):
+        self.mediaDir.cleanup()
+        self.patcher.stop()
+
+    def test_get(self):
+        self.index.add("http://example.com/a.png", "a.png", "x", "y")
+        self.assertIsNone(self.index.get("http://example.com/a.png"))
+        self.assertIsNone(self.index.get("http://example.com/b.png"))
+
+        open(os.path.join(self.mediaDir.name, "a.png"), "wb").close()
+        fileName, etag, modified, _ = self.index.get("http://example.com/a.png")
+        self.assertEqual((fileName, etag, modified), ("a.png", "x", "y"))
+
+    def test_isFresh(self):
+        now = time.time()
+        self.assertTrue(self.index.isFresh(("a.png", None, None, now)))
+        self.assertFalse(
+            self.index.isFresh(("a.png", None, None, now - self.revalidateAfter - 1))
+        )
+
+    def test_touch(self):
+        open(os.path.join(self.mediaDir.name, "a.png"), "wb").close()
+        with patch("ir.media.time.time", return_value=0):
+            self.index.add("http://example.com/a.png", "a.png")
+        self.assertFalse(self.index.isFresh(self.index.get("http://example.com/a.png")))
+
+        self.index.touch("http://example.com/a.png")
+        self.assertTrue(self.index.isFresh(self.index.get("http://example.com/a.png")))
@@ -0,0 +1,45 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from bs4 import BeautifulSoup
+
+SENTENCE = "This sentence, which is part of the article, is long enough to count. "
+
+
+class ExtractArticleTests(TestCase):
+    def setUp(self):
+        modules = {"aqt": MagicMock(), "ir.main": MagicMock()}
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir.readability import extractArticle
+
+        self.extractArticle = extractArticle
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_article(self):
+        paragraphs = "".join("<p>{}</p>".format(SENTENCE * 3) for _ in range(5))
+        webpage = BeautifulSoup(
+            "<html><body>"
+            '<nav><a href="/">Home</a></nav>'
+            '<div class="sidebar"><p>{}</p></div>'
+            '<div id="content"><h1>Title</h1>{}</div>'
+            '<div class="comments"><p>{}</p></div>'
+            "<footer>Copyright</footer>"
+            "</body></html>".format(SENTENCE, paragraphs, SENTENCE),
+            "html.parser",
+        )
+        self.assertTrue(self.extractArticle(webpage))
+        body = webpage.find("body")
+        self.assertEqual(
+            [tag.get("id") for tag in body.find_all(recursive=False)], ["content"]
+        )
+        self.assertEqual(len(body.find_all("p")), 5)
+
+    def test_short(self):
+        html = "<html><body><nav>Menu</nav><p>{}</p></body></html>".format(SENTENCE)
+        webpage = BeautifulSoup(html, "html.parser")
+        self.assertFalse(self.extractArticle(webpage))
+        self.assertIn(SENTENCE.strip(), webpage.get_text())
+        self.assertFalse(self.extractArticle(BeautifulSoup("text", "html.parser")))
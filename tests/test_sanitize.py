@@ -0,0 +1,61 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+
+class SanitizeTests(TestCase):
+    def setUp(self):
+        modules = {"aqt": MagicMock(), "ir.main": MagicMock()}
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir.sanitize import sanitize
+
+        self.sanitize = sanitize
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_badTags(self):
+        html = self.sanitize(
+            [
+                b"<p>a<!-- note --><script>if (a < b) {}</scr",
+                b"ipt>b<img src=x><iframe src=y></iframe>c</p>",
+            ],
+            ["script", "iframe", "img"],
+        )
+        self.assertEqual(html, "<p>abc</p>")
+
+    def test_unclosed(self):
+        html = self.sanitize([b"<p>a</p><style>p { color: red }"], ["style"])
+        self.assertEqual(html, "<p>a</p>")
+        html = self.sanitize([b"<p>a<object><p>b</p></p>c"], ["object"])
+        self.assertEqual(html, "<p>a</p>c")
+        html = self.sanitize([b"<div><object><span>a</div>b</object>c"], ["object"])
+        self.assertEqual(html, "<div></div>bc")
+
+    def test_charset(self):
+        text = "<p>caf\xe9</p>"
+        meta = '<meta charset="iso-8859-1">'
+        self.assertEqual(
+            self.sanitize([text.encode("latin-1")], [], "text/html; charset=latin-1"),
+            text,
+        )
+        self.assertEqual(
+            self.sanitize([(meta + text).encode("latin-1")], []), meta + text
+        )
+        # the header wins over the page
+        self.assertEqual(
+            self.sanitize(
+                [(meta + text).encode("utf-8")], [], "text/html; charset=utf-8"
+            ),
+            meta + text,
+        )
+        # split multibyte characters are decoded incrementally
+        data = text.encode("utf-8")
+        self.assertEqual(self.sanitize([data[:7], data[7:]], []), text)
+        # undeclared encodings are detected rather than assumed to be utf-8
+        self.assertEqual(self.sanitize([text.encode("utf-16")], []), text)
+        self.assertEqual(self.sanitize([text.encode("utf-8")], [], "text/html"), text)
+        self.assertEqual(
+            self.sanitize([text.encode("utf-8")], [], "text/html; charset=bogus"),
+            text,
+        )
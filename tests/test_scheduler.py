@@ -1,6 +1,9 @@
+import sys
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+from .collection import QUEUE_TYPE_SUSPENDED, Collection
+
 
 class SchedulerTests(TestCase):
     def setUp(self):
@@ -26,3 +29,217 @@ class SchedulerTests(TestCase):
         from ir.schedule import Scheduler
 
         Scheduler()
+
+    def test_getCardInfo(self):
+        from ir.schedule import Scheduler, mw
+
+        scheduler = Scheduler()
+        scheduler.settings = {
+            "modelName": "IR3",
+            "prioEnabled": True,
+            "prioField": "Priority",
+            "titleField": "Title",
+        }
+        mw.col.models.byName.return_value = {"id": 42}
+        mw.col.models.fieldMap.return_value = {
+            "Title": (0, {}),
+            "Priority": (1, {}),
+        }
+        mw.col.db.execute.return_value = [(1, 10, 3, "foo\x1f5\x1fbar")]
+
+        with patch("ir.schedule.splitFields", lambda s: s.split("\x1f")):
+            cardInfo = scheduler._getCardInfo(7)
+
+        self.assertEqual(
+            cardInfo,
+            [{"id": 1, "nid": 10, "due": 3, "title": "foo", "priority": "5"}],
+        )
+        self.assertEqual(mw.col.db.execute.call_args[0][1:], (7, 42))
+
+    def _repositionScheduler(self, dues):
+        from ir.schedule import Scheduler
+
+        scheduler = Scheduler()
+        scheduler._getCardInfo = MagicMock(
+            return_value=[{"id": i, "due": due} for i, due in enumerate(dues)]
+        )
+        return scheduler
+
+    def test_reposition_gap(self):
+        from ir.schedule import mw
+
+        mw.col.conf = {"nextPos": 100000}
+        scheduler = self._repositionScheduler([1024, 2048, 3072])
+        card = MagicMock(id=0)
+        scheduler.reposition(card, 2)
+        mw.col.sched.sortCards.assert_not_called()
+        self.assertEqual(mw.col.db.execute.call_args[0][1], 2560)
+        self.assertEqual(mw.col.db.execute.call_args[0][4], 0)
+
+    def test_reposition_renumber(self):
+        from ir.schedule import mw
+
+        mw.col.conf = {"nextPos": 1}
+        scheduler = self._repositionScheduler([1, 2, 3, 4])
+        card = MagicMock(id=0)
+        scheduler.reposition(card, 3)
+        mw.col.sched.sortCards.assert_called_once_with(
+            [1, 2, 0, 3], start=1024, step=1024
+        )
+        self.assertEqual(mw.col.conf["nextPos"], 4097)
+
+    def test_getCardInfo_cached(self):
+        from ir.schedule import Scheduler, mw
+
+        scheduler = Scheduler()
+        scheduler._loadCardInfo = MagicMock(return_value=[{"id": 1}])
+        mw.col.mod = 1
+        scheduler._getCardInfo(7)
+        scheduler._getCardInfo(7)
+        scheduler._loadCardInfo.assert_called_once_with(7)
+        mw.col.mod = 2
+        scheduler._getCardInfo(7)
+        self.assertEqual(scheduler._loadCardInfo.call_count, 2)
+
+    def test_reposition_collection(self):
+        from ir.schedule import Scheduler, mw
+
+        scheduler = Scheduler()
+        scheduler.settings = {
+            "modelName": "IR3",
+            "prioEnabled": False,
+            "titleField": "Title",
+        }
+        col = Collection()
+        model = col.models.addModel("IR3", ["Title", "Text", "Source"])
+        did = col.addDeck("Reading", model, 5, step=1024)
+
+        with patch.object(mw, "col", col), patch.multiple(
+            "ir.schedule",
+            QUEUE_TYPE_SUSPENDED=QUEUE_TYPE_SUSPENDED,
+            intTime=MagicMock(return_value=0),
+            splitFields=lambda flds: flds.split("\x1f"),
+        ):
+            cids = [c["id"] for c in scheduler._getCardInfo(did)]
+            scheduler.reposition(MagicMock(id=cids[0], did=did), 3)
+            expected = cids[1:3] + cids[:1] + cids[3:]
+            cardInfo = scheduler._getCardInfo(did)
+            self.assertEqual([c["id"] for c in cardInfo], expected)
+            scheduler.clearCardInfoCache()
+            cardInfo = scheduler._getCardInfo(did)
+            self.assertEqual([c["id"] for c in cardInfo], expected)
+
+
+class Index:
+    def __init__(self, row):
+        self._row = row
+
+    def row(self):
+        return self._row
+
+
+class ListModel:
+    """Just enough of QAbstractListModel to follow persistent indexes."""
+
+    def __init__(self, parent=None):
+        self.persistent = []
+        self.layoutAboutToBeChanged = MagicMock()
+        self.layoutChanged = MagicMock()
+
+    def beginResetModel(self):
+        pass
+
+    def endResetModel(self):
+        pass
+
+    def index(self, row):
+        return Index(row)
+
+    def persistentIndexList(self):
+        return self.persistent
+
+    def changePersistentIndexList(self, old, new):
+        # like Qt, update the indexes held by views and selections in place
+        for index, newIndex in zip(old, new):
+            index._row = newIndex.row()
+
+
+class CardListModelTests(TestCase):
+    def setUp(self):
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(QAbstractListModel=ListModel),
+            "PyQt5.QtWidgets": MagicMock(),
+            "anki": MagicMock(),
+            "anki.utils": MagicMock(),
+            "anki.consts": MagicMock(),
+            "aqt": MagicMock(),
+            "aqt.utils": MagicMock(),
+            "ir.main": MagicMock(),
+            "ir.util": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        sys.modules.pop("ir.schedule", None)
+        from ir.schedule import CardListModel
+
+        self.model = CardListModel({})
+        self.model.setCards([{"id": cid} for cid in range(6)])
+        # every row is tracked, as the view's current and selected rows are
+        self.model.persistent = [self.model.index(row) for row in range(6)]
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def assertOrder(self, cids):
+        self.assertEqual(self.model.cids(), cids)
+        # each persistent index still points at the card it pointed at before
+        self.assertEqual(
+            [self.model.cids()[index.row()] for index in self.model.persistent],
+            list(range(6)),
+        )
+
+    def test_moveToTop(self):
+        self.model.moveCards([2, 4], 0)
+        self.assertOrder([2, 4, 0, 1, 3, 5])
+
+    def test_moveToBottom(self):
+        self.model.moveCards([0, 3], 4)
+        self.assertOrder([1, 2, 4, 5, 0, 3])
+
+    def test_moveUp(self):
+        self.model.shiftCards([1, 2, 4], -1)
+        self.assertOrder([1, 2, 0, 4, 3, 5])
+
+    def test_moveDown(self):
+        self.model.shiftCards([1, 3, 4], 1)
+        self.assertOrder([0, 2, 1, 5, 3, 4])
+
+    def test_edges(self):
+        self.model.moveCards([0, 1], 0)
+        self.assertOrder(list(range(6)))
+        self.model.moveCards([4, 5], 4)
+        self.assertOrder(list(range(6)))
+
+        from ir.schedule import Scheduler
+
+        scheduler = Scheduler()
+        scheduler.cardListView = MagicMock()
+        model = scheduler.cardListView.model.return_value
+        model.rowCount.return_value = 6
+        scheduler._getSelected = MagicMock(return_value=[0, 2])
+        scheduler._moveUp()
+        scheduler._getSelected = MagicMock(return_value=[3, 5])
+        scheduler._moveDown()
+        model.shiftCards.assert_not_called()
+
+    def test_selection(self):
+        selected = [self.model.persistent[row] for row in [1, 3]]
+        self.model.shiftCards([1, 3], -1)
+        self.assertEqual([index.row() for index in selected], [0, 2])
+        self.model.shiftCards([0, 2], 1)
+        self.model.shiftCards([1, 3], 1)
+        self.assertOrder([0, 2, 1, 4, 3, 5])
+        self.assertEqual([index.row() for index in selected], [2, 4])
+        self.model.moveCards([2, 4], 0)
+        self.assertEqual([index.row() for index in selected], [0, 1])
@@ -13,10 +13,53 @@ class SaveTests(SettingsTests):
         dump_patcher.start()
         self.sm.getSettingsPath = MagicMock(return_value="foo.json")
         self.sm.settings = {"foo": "bar"}
-        self.sm.save()
-        open_mock.assert_called_once_with("foo.json", "w", encoding="utf-8")
+        replace_mock = MagicMock()
+        replace_patcher = patch("ir.settings.os.replace", replace_mock)
+        replace_patcher.start()
+        with patch("ir.settings.mw.pm.profileFolder", return_value="profile"):
+            self.sm.save()
+        open_mock.assert_called_once_with("profile/foo.json.tmp", "w", encoding="utf-8")
         dump_mock.assert_called_once_with({"foo": "bar"}, open_mock())
+        replace_mock.assert_called_once_with("profile/foo.json.tmp", "foo.json")
         dump_patcher.stop()
+        replace_patcher.stop()
+
+
+class FlushTests(SettingsTests):
+    def test_flush(self):
+        self.sm.settings = {"foo": "bar", "modified": []}
+        self.sm._write = MagicMock()
+        self.sm.getMediaDir = MagicMock(return_value="foo")
+        patch("ir.settings.updateModificationTime", MagicMock()).start()
+        self.sm.flush()
+        self.sm._write.reset_mock()
+        self.sm.flush()
+        self.sm._write.assert_not_called()
+        self.sm["foo"] = "baz"
+        self.sm.flush()
+        self.sm._write.assert_called_once_with(
+            "foo/_ir.json", {"foo": "baz", "modified": ["foo"]}
+        )
+
+    def test_removeLegacy(self):
+        self.sm.settings = {"scroll": {"1": 50}, "modified": ["scroll"]}
+        self.sm.getMediaDir = MagicMock(return_value="foo")
+        self.sm.save = MagicMock()
+        remove = MagicMock(side_effect=[OSError, None, None])
+        with patch("ir.settings.os.path.isfile", return_value=True), patch(
+            "ir.settings.os.remove", remove
+        ):
+            self.assertEqual(self.sm.getLegacy("scroll"), {"1": 50})
+            self.assertEqual(self.sm.getLegacy("zoom"), {})
+            # interrupted after the settings were written
+            with self.assertRaises(OSError):
+                self.sm.removeLegacy()
+            self.sm.save.assert_called_once_with()
+            self.sm.removeLegacy()
+        self.assertEqual(self.sm.settings, {"modified": []})
+        self.sm.save.assert_called_once_with()
+        remove.assert_any_call("foo/_ir_scroll.json")
+        remove.assert_any_call("foo/_ir_zoom.json")
 
 
 class PathTests(SettingsTests):
@@ -0,0 +1,62 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+
+class SaveTests(TestCase):
+    def setUp(self):
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(),
+            "PyQt5.QtGui": MagicMock(),
+            "PyQt5.QtWidgets": MagicMock(),
+            "anki": MagicMock(),
+            "anki.notes": MagicMock(),
+            "aqt": MagicMock(),
+            "aqt.addcards": MagicMock(),
+            "aqt.editcurrent": MagicMock(),
+            "aqt.utils": MagicMock(),
+            "ir.main": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir import text
+
+        self.mw = text.mw = MagicMock()
+        self.note = {"Text": "<p>one two three</p>"}
+        self.mw.reviewer.card.note.return_value = MagicMock(
+            id=1,
+            __getitem__=lambda _, k: self.note[k],
+            __setitem__=lambda _, k, v: self.note.__setitem__(k, v),
+        )
+        self.tm = text.TextManager()
+        self.tm.history = text.defaultdict(list)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_changes(self):
+        self.tm._applyChanges({"snapshot": "<p>one two three</p>"})
+        self.tm._applyChanges(
+            {"start": 7.0, "suffix": 10.0, "text": '<span class="x">two</span>'}
+        )
+        self.assertEqual(
+            self.note["Text"], '<p>one <span class="x">two</span> three</p>'
+        )
+        self.tm._applyChanges({"start": 3.0, "suffix": 4.0, "text": ""})
+        self.assertEqual(self.note["Text"], "<p></p>")
+
+        self.tm.undo()
+        self.assertEqual(
+            self.note["Text"], '<p>one <span class="x">two</span> three</p>'
+        )
+        self.tm.undo()
+        self.assertEqual(self.note["Text"], "<p>one two three</p>")
+
+    def test_changedElsewhere(self):
+        self.tm._applyChanges({"snapshot": "<p>one two three</p>"})
+        self.note["Text"] = "<p>edited</p>"
+        self.tm._applyChanges({"start": 3.0, "suffix": 4.0, "text": ""})
+        self.assertEqual(self.note["Text"], "<p>edited</p>")
+        self.mw.web.evalWithCallback.assert_called_once_with(
+            "irText.changes(0);", self.tm._applyChanges
+        )
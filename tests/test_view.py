@@ -0,0 +1,60 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+
+class ViewManagerTests(TestCase):
+    def setUp(self):
+        modules = {
+            "PyQt5": MagicMock(),
+            "PyQt5.QtCore": MagicMock(),
+            "PyQt5.QtGui": MagicMock(),
+            "PyQt5.QtWidgets": MagicMock(),
+            "anki": MagicMock(),
+            "anki.hooks": MagicMock(),
+            "aqt": MagicMock(),
+            "aqt.reviewer": MagicMock(),
+            "ir.main": MagicMock(),
+        }
+        self.patcher = patch.dict("sys.modules", modules)
+        self.patcher.start()
+        from ir import view
+
+        self.mw = view.mw = MagicMock()
+        self.vm = view.ViewManager()
+        self.cardState = MagicMock()
+        self.vm._getCardState = lambda: self.cardState
+        self.vm.settings = {"limitWidth": True, "limitWidthAll": False, "maxWidth": 800}
+        self.isIrCardPatcher = patch.object(view, "isIrCard", return_value=True)
+        self.isIrCardPatcher.start()
+
+    def tearDown(self):
+        self.isIrCardPatcher.stop()
+        self.patcher.stop()
+
+    def test_prepareCard(self):
+        self.cardState.getScroll.return_value = 300
+        card = MagicMock(id=1)
+        html = self.vm.prepareCard("", card, "reviewQuestion")
+        self.assertIn("irSetMaxWidth(800); irScroll.setCard(1, 300);", html)
+        html = self.vm.prepareCard("", card, "reviewAnswer")
+        self.assertNotIn("irSetMaxWidth", html)
+        self.assertIn("irScroll.setCard(1, 300);", html)
+        self.assertIn(
+            "function irSetMaxWidth", self.vm.prepareCard("", card, "preview")
+        )
+
+    def test_report(self):
+        self.vm.origBridgeCmd = MagicMock()
+        self.vm.onBridgeCmd("irScroll:1:500:40")
+        self.vm.onBridgeCmd("ans")
+        self.cardState.setScroll.assert_called_once_with(1, 500)
+        self.vm.origBridgeCmd.assert_called_once_with("ans")
+        self.assertEqual((self.vm.scrollEvents, self.vm.scrollReports), (40, 1))
+
+    def test_flush(self):
+        self.vm.flushScroll()
+        callback = self.mw.web.evalWithCallback.call_args[0][1]
+        callback(None)
+        self.cardState.setScroll.assert_not_called()
+        callback([2, 300, 3])
+        self.cardState.setScroll.assert_called_once_with(2, 300)